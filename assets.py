@@ -0,0 +1,213 @@
+import pygame
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+
+ASSET_CACHE = {}
+IMAGE_CACHE = {}
+DECODING = {}
+DECODER = ThreadPoolExecutor(max_workers=4)
+CHECK_FORMATS = False
+UNCONVERTED = set()
+TILE_CACHE = {}
+FONT_CACHE = {}
+
+
+def get_asset(key, load):
+    """
+    Returns a process-wide asset, creating it with load() on first use.
+
+    Args:
+        key: A hashable key naming the asset.
+        load: A function with no arguments that creates the asset.
+
+    Returns:
+        The asset.
+    """
+
+    if key not in ASSET_CACHE:
+        ASSET_CACHE[key] = load()
+
+    return ASSET_CACHE[key]
+
+
+def preload(paths: list) -> None:
+    """
+    Starts decoding image files on background threads.
+
+    Only the decoding runs on the threads. get_image() converts a decoded
+    image to the display format on the calling thread, waiting for it if it
+    is not decoded yet.
+
+    Args:
+        paths (list): The paths of the image files.
+
+    Returns:
+        None
+    """
+
+    loaded = {key[0] for key in IMAGE_CACHE}
+    for path in paths:
+        if path not in DECODING and path not in loaded:
+            DECODING[path] = DECODER.submit(pygame.image.load, path)
+
+
+def convert_decoded() -> int:
+    """
+    Converts the images that finished decoding in the background, without waiting for the others.
+
+    Returns:
+        The number of images still decoding.
+    """
+
+    for path, decoding in list(DECODING.items()):
+        if decoding.done():
+            get_image(path)
+
+    return len(DECODING)
+
+
+def get_image(path: str, size: tuple = None, alpha: bool = True) -> pygame.Surface:
+    """
+    Returns an image converted to the display format, loading and scaling it on first use.
+
+    The image is shared between callers, so it must not be drawn on.
+
+    Args:
+        path (str): The path of the image file.
+        size (tuple): The (width, height) to scale the image to, or None to keep its size.
+        alpha (bool): Whether to keep the transparency of the image. Opaque images blit faster without it.
+
+    Returns:
+        A pygame surface.
+    """
+
+    key = (path, size, alpha)
+    if key not in IMAGE_CACHE:
+        if size:
+            image = pygame.transform.scale(get_image(path, None, alpha), size)
+        else:
+            decoding = DECODING.pop(path, None)
+            image = decoding.result() if decoding else pygame.image.load(path)
+            image = image.convert_alpha() if alpha else image.convert()
+        IMAGE_CACHE[key] = image
+
+    return IMAGE_CACHE[key]
+
+
+def get_tile(tile_number: int, tile_size: int) -> tuple:
+    """
+    Returns the scaled image and mask of a tile type, loading them on first use.
+
+    Every tile of the same type and size shares the returned objects, so the
+    image must not be drawn on.
+
+    Args:
+        tile_number (int): The number of the tile to load.
+        tile_size (int): The size of the tile in pixels.
+
+    Returns:
+        A tuple of (image, mask).
+    """
+
+    key = (tile_number, tile_size)
+    if key not in TILE_CACHE:
+        tile_image = get_image(f"Tiles/{tile_number}.png", (tile_size, tile_size))
+        TILE_CACHE[key] = (tile_image, pygame.mask.from_surface(tile_image))
+
+    return TILE_CACHE[key]
+
+
+def get_font(name: str, size: int) -> pygame.font.Font:
+    """
+    Returns a system font, looking it up on first use.
+
+    Args:
+        name (str): The name of the font.
+        size (int): The size of the font.
+
+    Returns:
+        A pygame font object.
+    """
+
+    key = (name, size)
+    if key not in FONT_CACHE:
+        FONT_CACHE[key] = pygame.font.SysFont(name, size)
+
+    return FONT_CACHE[key]
+
+
+@lru_cache(maxsize=256)
+def render_text(text: str, font: pygame.font.Font, text_color: tuple) -> pygame.Surface:
+    """
+    Returns the rendered image of a text, rendering it only if it is not cached.
+
+    The image is shared between callers, so it must not be drawn on.
+
+    Args:
+        text (str): The text to render.
+        font (pygame.font.Font): The font to render with.
+        text_color (tuple): The color of the text.
+
+    Returns:
+        A pygame surface.
+    """
+
+    return font.render(text, True, text_color).convert_alpha()
+
+
+def set_format_check(enabled: bool) -> None:
+    """
+    Turns the check of the surfaces blitted every frame on or off.
+
+    Args:
+        enabled (bool): Whether check_formats() warns about surfaces not in the display format.
+
+    Returns:
+        None
+    """
+
+    global CHECK_FORMATS
+    CHECK_FORMATS = enabled
+
+
+def in_display_format(surface: pygame.Surface) -> bool:
+    """
+    Returns whether a surface has the pixel format of the display, so blitting it needs no conversion.
+
+    Args:
+        surface (pygame.Surface): The surface to check.
+
+    Returns:
+        True if the surface is in the display format or no display mode is set, False otherwise.
+    """
+
+    display = pygame.display.get_surface()
+    if display is None:
+        return True
+
+    return surface.get_bitsize() == display.get_bitsize() and surface.get_masks()[:3] == display.get_masks()[:3]
+
+
+def check_formats(surfaces: dict) -> None:
+    """
+    Warns once about each surface that is not in the display format, if the check is turned on.
+
+    Call it where the surfaces are blitted every frame; it returns straight
+    away while the check is off.
+
+    Args:
+        surfaces (dict): A dictionary mapping names to the surfaces to check.
+
+    Returns:
+        None
+    """
+
+    if not CHECK_FORMATS:
+        return
+
+    for name, surface in surfaces.items():
+        if name not in UNCONVERTED and not in_display_format(surface):
+            UNCONVERTED.add(name)
+            warnings.warn(f"{name} is blitted every frame but is not in the display format", stacklevel=2)
@@ -0,0 +1,698 @@
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+import pygame
+from collections import defaultdict
+from unittest import mock
+from os.path import join
+import level_editor
+import play
+from assets import get_tile
+from levels import TILE_KINDS, list_levels, load_level, save_level
+from collision import CollisionGrid
+from entities import EntitySystem
+from render import Backdrop, ChunkedLayer, DirtyRects, TileLayer
+from recording import InputRecorder, ReplayKeys
+from replay import load_replay
+
+
+WIDTH, HEIGHT = 1280, 720
+ROWS = 16
+TILE_SIZE = HEIGHT // ROWS
+PLAYER_VEL = 6
+FPS = 60
+
+
+def make_level(columns: int, density: float = 0.1, seed: int = 0) -> list:
+    """
+    Generates a level grid of tile numbers.
+
+    The two bottom rows are solid ground, and the rows above are filled with
+    random tiles with the given density. The first columns are kept free so
+    the player lands on the ground.
+
+    Args:
+        columns (int): The number of columns of the level.
+        density (float): The chance of a cell above the ground holding a tile.
+        seed (int): The seed of the random generator.
+
+    Returns:
+        A list of rows of tile numbers.
+    """
+
+    rng = random.Random(seed)
+    level_data = [[-1] * columns for _ in range(ROWS)]
+    for x in range(columns):
+        level_data[ROWS - 2][x] = 1
+        level_data[ROWS - 1][x] = 4
+        if x < 10:
+            continue
+        for y in range(2, ROWS - 2):
+            if rng.random() < density:
+                level_data[y][x] = rng.choice([0, 1, 2, 3, 9, 10, 11, 12, 14, 18])
+
+    return level_data
+
+
+def build_objects(level_data: list, tile_size: int) -> list:
+    """
+    Builds the sprites of a level grid, enemies first as play() orders them.
+
+    Args:
+        level_data (list): A list of rows of tile numbers.
+        tile_size (int): The size of each tile in pixels.
+
+    Returns:
+        A list of pygame sprite objects.
+    """
+
+    layers = play.get_layers(level_data, tile_size)
+
+    return layers["enemy"] + layers["tile"] + layers["water"]
+
+
+def time_collision(objects: list, frames: int) -> tuple:
+    """
+    Times the grid collision path of handle_move against a full scan of the objects.
+
+    Args:
+        objects (list): The sprites of the level.
+        frames (int): The number of frames to run.
+
+    Returns:
+        A tuple of (grid, scan) milliseconds per frame.
+    """
+
+    world = CollisionGrid(TILE_SIZE)
+    world.extend(objects)
+
+    player = play.Player(100, 100, 50, 50)
+    start = time.perf_counter()
+    for _ in range(frames):
+        player.loop(FPS)
+        play.handle_move(player, world, PLAYER_VEL, HEIGHT, defaultdict(bool))
+    grid = (time.perf_counter() - start) * 1000 / frames
+
+    player = play.Player(100, 100, 50, 50)
+    start = time.perf_counter()
+    for _ in range(frames):
+        player.loop(FPS)
+        collide(player, objects, -PLAYER_VEL * 2)
+        collide(player, objects, PLAYER_VEL * 2)
+        handle_vertical_collision(player, objects, player.y_vel)
+    scan = (time.perf_counter() - start) * 1000 / frames
+
+    return grid, scan
+
+
+def time_draw(window: pygame.Surface, objects: list, frames: int) -> tuple:
+    """
+    Times draw_level on the chunked layer against blitting every object, scrolling right.
+
+    Args:
+        window (pygame.Surface): The surface to draw on.
+        objects (list): The sprites of the level.
+        frames (int): The number of frames to run.
+
+    Returns:
+        A tuple of (chunked, per-object) milliseconds per frame.
+    """
+
+    layer = ChunkedLayer(TILE_SIZE * 32, HEIGHT)
+    layer.extend(objects)
+
+    start = time.perf_counter()
+    for frame in range(frames):
+        play.draw_level(window, layer, frame * PLAYER_VEL)
+    chunked = (time.perf_counter() - start) * 1000 / frames
+
+    start = time.perf_counter()
+    for frame in range(frames):
+        for sprite in objects:
+            window.blit(sprite.image, (sprite.rect.x - frame * PLAYER_VEL, sprite.rect.y))
+    blit_all = (time.perf_counter() - start) * 1000 / frames
+
+    return chunked, blit_all
+
+
+def time_display(window: pygame.Surface, objects: list, frames: int) -> dict:
+    """
+    Times play.draw with and without dirty rectangles, with a still and a scrolling camera.
+
+    Args:
+        window (pygame.Surface): The display surface.
+        objects (list): The sprites of the level.
+        frames (int): The number of frames to run.
+
+    Returns:
+        A dictionary mapping (dirty_rects, scrolling) to milliseconds per frame.
+    """
+
+    background = play.get_background("background.png", WIDTH, HEIGHT)
+    life_img = play.get_background("life.png", 40, 32)
+    layer = ChunkedLayer(TILE_SIZE * 32, HEIGHT)
+    layer.extend(objects)
+
+    results = {}
+    for dirty_rects in [False, True]:
+        for scrolling in [False, True]:
+            dirty = DirtyRects(dirty_rects)
+            player = play.Player(100, 100, 50, 50)
+            start = time.perf_counter()
+            for frame in range(frames):
+                player.loop(FPS)
+                player.rect.y = 100
+                play.draw(window, background, life_img, player, frame * scrolling, layer, dirty)
+            results[(dirty_rects, scrolling)] = (time.perf_counter() - start) * 1000 / frames
+
+    return results
+
+
+def time_player(frames: int) -> float:
+    """
+    Times the per-frame player work: one loop and the four updates of the collision probes.
+
+    Args:
+        frames (int): The number of frames to run.
+
+    Returns:
+        The microseconds per frame.
+    """
+
+    player = play.Player(100, 100, 50, 50)
+    start = time.perf_counter()
+    for frame in range(frames):
+        player.x_vel = PLAYER_VEL if frame % 100 < 50 else 0
+        player.loop(FPS)
+        player.rect.y = 100
+        player.y_vel = 0
+        for _ in range(4):
+            player.update()
+
+    return (time.perf_counter() - start) * 1000000 / frames
+
+
+def time_simulation(layers: dict, animations: dict, frames: int) -> float:
+    """
+    Runs a headless simulation holding RIGHT and jumping every 37 frames, restarting on game over.
+
+    Args:
+        layers (dict): The classified sprites of the level.
+        animations (dict): The player's animation table.
+        frames (int): The number of frames to run.
+
+    Returns:
+        The simulated frames per second.
+    """
+
+    keys = defaultdict(bool, {pygame.K_RIGHT: True})
+    world = play.get_world(layers, TILE_SIZE)
+    simulation = play.Simulation(WIDTH, HEIGHT, world, animations)
+    start = time.perf_counter()
+    for frame in range(frames):
+        if simulation.step(keys, int(frame % 37 == 0)):
+            simulation = play.Simulation(WIDTH, HEIGHT, world, animations)
+
+    return frames / (time.perf_counter() - start)
+
+
+def handle_vertical_collision(player, objects: list, dy: int) -> list:
+    """
+    Handle vertical collision between a player and a list of objects.
+
+    Args:
+        player (Player): An instance of the Player class.
+        objects (list): A list of objects to check for collision.
+        dy (int): The change in y-position of the player.
+
+    Returns:
+        A list of collided objects.
+    """
+
+    collided_objects = []
+    for object in objects:
+        if pygame.sprite.collide_mask(player, object):
+            if dy > 0:
+                player.rect.bottom = object.rect.top
+                player.landed()
+            elif dy < 0:
+                player.rect.top = object.rect.bottom
+                player.hit_head()
+
+            collided_objects.append(object)
+
+    return collided_objects
+
+
+def collide(player, objects: list, dx: int) -> pygame.sprite.Sprite:
+    """
+    Check for collision between a player and a list of objects.
+
+    Args:
+        player (Player): An instance of the Player class.
+        objects (list): A list of objects to check for collision.
+        dx (int): The change in x-position of the player.
+
+    Returns:
+        The first object in objects that collides with player or None if there is no collision.
+    """
+
+    player.move(dx, 0)
+    player.update()
+    collided_object = next(
+        (
+            object
+            for object in objects
+            if pygame.sprite.collide_mask(player, object)
+        ),
+        None,
+    )
+    player.move(-dx, 0)
+    player.update()
+
+    return collided_object
+
+
+def handle_move_reference(player, world: CollisionGrid, player_vel: int, height: int, keys) -> None:
+    """
+    handle_move() as it was before the collision grid: two probe moves with collide() and a second pass for the floor,
+    over every object of the world.
+
+    Args:
+        player (Player): An instance of the Player class.
+        world (CollisionGrid): A grid of the objects that can be collided with.
+        player_vel (int): The velocity of the player.
+        height (int): The height of the screen.
+        keys: The pressed state of each key, indexed like pygame.key.get_pressed().
+
+    Returns:
+        None
+    """
+
+    player.x_vel = 0
+    objects = list(world)
+    collide_left = collide(player, objects, -player_vel * 2)
+    collide_right = collide(player, objects, player_vel * 2)
+
+    if keys[pygame.K_LEFT] and not collide_left and not player.hit:
+        player.move_left(player_vel)
+    if keys[pygame.K_RIGHT] and not collide_right and not player.hit:
+        player.move_right(player_vel)
+
+    vertical_collide = handle_vertical_collision(player, objects, player.y_vel)
+    for object in [collide_left, collide_right, *vertical_collide]:
+        if object:
+            kind = TILE_KINDS[object.tile_number]
+            if kind == "enemy":
+                player.make_hit()
+            elif kind == "water":
+                player.rect.y += 18
+                player.y_vel += 10
+                player.make_hit()
+
+    if player.rect.y > height:
+        player.make_hit()
+
+
+def random_recording(steps: int, seed: int = 0) -> InputRecorder:
+    """
+    Generates the input of a play session: runs of left, right, both or no keys, with jumps.
+
+    Args:
+        steps (int): The number of steps.
+        seed (int): The seed of the random generator.
+
+    Returns:
+        An InputRecorder holding the steps.
+    """
+
+    rng = random.Random(seed)
+    recording = InputRecorder(0, "")
+    keys = 0
+    for step in range(steps):
+        if step % 30 == 0:
+            keys = rng.choice([0, 1, 2, 2, 2, 3])
+        recording.steps.append(keys | (rng.random() < 0.06) << 2)
+
+    return recording
+
+
+def compare_resolver(world: CollisionGrid, animations: dict, recording: InputRecorder) -> dict:
+    """
+    Steps a recording through handle_move() and handle_move_reference() side by side.
+
+    Args:
+        world (CollisionGrid): A grid of the objects that can be collided with.
+        animations (dict): The player's animation table.
+        recording (InputRecorder): The input of each step.
+
+    Returns:
+        A dictionary with the number of steps, the number of steps after which the players differ,
+        and the microseconds per call of both.
+    """
+
+    simulation = play.Simulation(WIDTH, HEIGHT, world, animations)
+    reference = play.Simulation(WIDTH, HEIGHT, world, animations)
+    timed = {"handle_move": 0.0, "reference": 0.0}
+
+    def timer(name, handler):
+        def timed_handler(*args):
+            start = time.perf_counter()
+            handler(*args)
+            timed[name] += time.perf_counter() - start
+        return timed_handler
+
+    mismatches = 0
+    for bits in recording.steps:
+        keys, jumps = ReplayKeys(bits), bits >> 2
+        with mock.patch.object(play, "handle_move", timer("handle_move", play.handle_move)):
+            simulation.step(keys, jumps)
+        with mock.patch.object(play, "handle_move", timer("reference", handle_move_reference)):
+            reference.step(keys, jumps)
+
+        states = [
+            (tuple(player.rect), player.x_vel, player.y_vel, player.hit, player.hit_count,
+             player.jump_count, player.fall_count, player.direction, player.animation_count)
+            for player in (simulation.player, reference.player)
+        ]
+        if states[0] != states[1] or simulation.offset_x != reference.offset_x:
+            mismatches += 1
+
+    steps = max(1, len(recording.steps))
+
+    return {
+        "steps": len(recording.steps),
+        "mismatched_steps": mismatches,
+        "handle_move_us": timed["handle_move"] * 1e6 / steps,
+        "reference_us": timed["reference"] * 1e6 / steps,
+    }
+
+
+def time_entities(count: int, frames: int) -> tuple:
+    """
+    Times a step of patrolling enemies in the entity arrays against the same enemies as sprites.
+
+    Each step moves every enemy, turns back the ones that left their patrol
+    range and tests them all against the player.
+
+    Args:
+        count (int): The number of enemies.
+        frames (int): The number of steps to run.
+
+    Returns:
+        A tuple of (arrays, sprites) microseconds per step.
+    """
+
+    rng = random.Random(count)
+    player = play.Player(100, 500, 64, 64)
+    player.loop(FPS)
+    starts = [(rng.randrange(0, 10000), rng.randrange(0, HEIGHT - TILE_SIZE), rng.choice([-2, 2])) for _ in range(count)]
+
+    entities = EntitySystem(TILE_SIZE)
+    for x, y, vx in starts:
+        entities.add(14, x, y, (vx, 0), (x - 200, y), (x + 200, y))
+    start = time.perf_counter()
+    for _ in range(frames):
+        entities.update()
+        entities.collide(player.rect, player.mask)
+    arrays = (time.perf_counter() - start) * 1e6 / frames
+
+    sprites = []
+    for x, y, vx in starts:
+        sprite = play.get_mask(14, TILE_SIZE, x, y)
+        sprite.x_vel, sprite.low, sprite.high = vx, x - 200, x + 200
+        sprites.append(sprite)
+    start = time.perf_counter()
+    for _ in range(frames):
+        for sprite in sprites:
+            sprite.rect.x += sprite.x_vel
+            if not sprite.low <= sprite.rect.x <= sprite.high:
+                sprite.x_vel = -sprite.x_vel
+                sprite.rect.x = min(max(sprite.rect.x, sprite.low), sprite.high)
+        [sprite for sprite in sprites if pygame.sprite.collide_mask(player, sprite)]
+    scan = (time.perf_counter() - start) * 1e6 / frames
+
+    return arrays, scan
+
+
+def write_level(path: str, level: int, level_data: list) -> None:
+    """
+    Writes a level grid to path/level_N in the binary level format.
+
+    Args:
+        path (str): The directory to write to.
+        level (int): The level number.
+        level_data (list): A list of rows of tile numbers.
+
+    Returns:
+        None
+    """
+
+    save_level(join(path, f"level_{level}"), level_data)
+
+
+def time_play_frames(window: pygame.Surface, path: str, level: int, animations: dict, frames: int) -> dict:
+    """
+    Loads a level file and runs the phases of the play() loop on it, scrolling right.
+
+    Args:
+        window (pygame.Surface): The display surface.
+        path (str): The directory of the level file.
+        level (int): The level number.
+        animations (dict): The player's animation table.
+        frames (int): The number of frames to run.
+
+    Returns:
+        A dictionary of the load time and the milliseconds per frame of each phase.
+    """
+
+    start = time.perf_counter()
+    layers = play.get_objects(level, TILE_SIZE, path)
+    load = time.perf_counter() - start
+
+    world = play.get_world(layers, TILE_SIZE)
+    simulation = play.Simulation(WIDTH, HEIGHT, world, animations)
+    player = simulation.player
+    layer = ChunkedLayer(TILE_SIZE * 32, HEIGHT)
+    layer.extend(world)
+    background = play.get_background("background.png", WIDTH, HEIGHT)
+    keys = defaultdict(bool, {pygame.K_RIGHT: True})
+
+    phases = dict.fromkeys(["loop", "collision", "draw_level", "draw", "display_update"], 0.0)
+    for frame in range(frames):
+        offset_x = frame * PLAYER_VEL
+        player.rect.topleft = (offset_x + 400, 100)
+
+        start = time.perf_counter()
+        player.loop(FPS)
+        phases["loop"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        play.handle_move(player, simulation.world, PLAYER_VEL, HEIGHT, keys)
+        phases["collision"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        window.blit(background, (0, 0))
+        phases["draw"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        play.draw_level(window, layer, offset_x)
+        phases["draw_level"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        player.draw(window, offset_x)
+        phases["draw"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        pygame.display.update()
+        phases["display_update"] += time.perf_counter() - start
+
+    result = {"load_ms": load * 1000, "objects": len(world)}
+    result.update({f"{name}_ms": total * 1000 / frames for name, total in phases.items()})
+
+    return result
+
+
+def time_streaming(path: str, level: int, animations: dict, frames: int) -> dict:
+    """
+    Starts a streamed level and runs a headless simulation across it at a fast camera speed.
+
+    Args:
+        path (str): The directory of the level file.
+        level (int): The level number.
+        animations (dict): The player's animation table.
+        frames (int): The number of frames to run.
+
+    Returns:
+        A dictionary of the start time, the milliseconds per frame and the most sprites loaded at once.
+    """
+
+    start = time.perf_counter()
+    stream = play.LevelStream(load_level(join(path, f"level_{level}")), TILE_SIZE, WIDTH)
+    simulation = play.Simulation(WIDTH, HEIGHT, stream.world, animations, stream=stream)
+    start_time = time.perf_counter() - start
+
+    keys = defaultdict(bool)
+    max_sprites = 0
+    start = time.perf_counter()
+    for frame in range(frames):
+        simulation.offset_x = frame * WIDTH // 4
+        simulation.player.rect.topleft = (simulation.offset_x + 400, 100)
+        simulation.step(keys)
+        max_sprites = max(max_sprites, len(stream.world))
+
+    return {
+        "start_ms": start_time * 1000,
+        "frame_ms": (time.perf_counter() - start) * 1000 / frames,
+        "max_sprites": max_sprites,
+    }
+
+
+def time_editor_frames(window: pygame.Surface, level_data: list, frames: int) -> dict:
+    """
+    Runs the drawing phases of the edit_level() loop on a level grid, scrolling right.
+
+    Args:
+        window (pygame.Surface): The display surface.
+        level_data (list): A list of rows of tile numbers.
+        frames (int): The number of frames to run.
+
+    Returns:
+        A dictionary of the milliseconds per frame of each phase.
+    """
+
+    tiles = [get_tile(i, TILE_SIZE)[0] for i in range(len(TILE_KINDS))]
+    background = play.get_background("background.png", WIDTH, HEIGHT)
+    columns = len(level_data[0])
+    tile_layer = TileLayer(level_data, tiles, TILE_SIZE)
+    backdrop = Backdrop((106, 181, 111), background, (115, 115, 115), columns, ROWS, TILE_SIZE, HEIGHT)
+
+    phases = dict.fromkeys(["background", "draw_level"], 0.0)
+    for frame in range(frames):
+        scroll = (frame * 5) % max(1, columns * TILE_SIZE - WIDTH)
+
+        start = time.perf_counter()
+        level_editor.draw_background(window, backdrop, WIDTH, scroll)
+        phases["background"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        level_editor.draw_level(window, tile_layer, WIDTH, scroll)
+        phases["draw_level"] += time.perf_counter() - start
+
+    return {f"{name}_ms": total * 1000 / frames for name, total in phases.items()}
+
+
+def run(widths: list, densities: list, frames: int) -> dict:
+    """
+    Runs the benchmark suite over synthetic levels of every width and density.
+
+    Args:
+        widths (list): The numbers of columns of the generated levels.
+        densities (list): The tile densities of the generated levels.
+        frames (int): The number of frames to run each frame loop for.
+
+    Returns:
+        A dictionary holding the report.
+    """
+
+    pygame.init()
+    window = pygame.display.set_mode((WIDTH, HEIGHT))
+    animations = play.get_animations(play.load_sprites("Player", 32, 32, True))
+    play.Player.ANIMATIONS = animations
+
+    report = {
+        "frames": frames,
+        "player_us": time_player(frames * 100),
+        "display": [
+            {"dirty_rects": dirty_rects, "scrolling": scrolling, "draw_ms": cost}
+            for (dirty_rects, scrolling), cost in time_display(
+                window, build_objects(make_level(150), TILE_SIZE), frames
+            ).items()
+        ],
+        "simulation": [
+            {"level": level, "frames_per_second": time_simulation(play.get_objects(level, TILE_SIZE), animations, frames * 10)}
+            for level in list_levels()
+        ],
+        "entities": [
+            {"count": count, "arrays_us": arrays, "sprites_us": sprites}
+            for count in (10, 100, 1000)
+            for arrays, sprites in [time_entities(count, frames * 10)]
+        ],
+        "resolver": [
+            {"level": level, **compare_resolver(
+                play.get_world(play.get_objects(level, TILE_SIZE), TILE_SIZE), animations, random_recording(frames * 10, level)
+            )}
+            for level in list_levels()
+        ],
+        "levels": [],
+    }
+
+    with tempfile.TemporaryDirectory() as path:
+        level = 0
+        for density in densities:
+            for columns in widths:
+                level_data = make_level(columns, density)
+                write_level(path, level, level_data)
+                objects = build_objects(level_data, TILE_SIZE)
+                grid, scan = time_collision(objects, frames)
+                chunked, blit_all = time_draw(window, objects, frames)
+
+                result = {"columns": columns, "density": density}
+                result["play"] = time_play_frames(window, path, level, animations, frames)
+                result["play"]["collision_scan_ms"] = scan
+                result["play"]["draw_level_blit_all_ms"] = blit_all
+                result["resolver"] = compare_resolver(
+                    play.get_world(play.get_layers(level_data, TILE_SIZE), TILE_SIZE), animations, random_recording(frames * 10, level)
+                )
+                result["streaming"] = time_streaming(path, level, animations, frames)
+                result["editor"] = time_editor_frames(window, level_data, frames)
+                report["levels"].append(result)
+                level += 1
+
+    pygame.quit()
+
+    return report
+
+
+def main(argv: list) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the play and level editor frame loops.")
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--widths", type=int, nargs="+", default=[150, 1000, 5000, 10000])
+    parser.add_argument("--densities", type=float, nargs="+", default=[0.05, 0.2])
+    parser.add_argument("--output", help="The JSON file to write the report to, stdout by default.")
+    parser.add_argument("--compare-resolver", nargs="+", metavar="REPLAY",
+                        help="Only check that handle_move() matches the old collision code over recorded sessions.")
+    args = parser.parse_args(argv)
+
+    if args.compare_resolver:
+        pygame.init()
+        pygame.display.set_mode((WIDTH, HEIGHT))
+        animations = play.get_animations(play.load_sprites("Player", 32, 32, True))
+        report = {}
+        for path in args.compare_resolver:
+            recording = load_replay(path)
+            world = play.get_world(play.get_objects(recording.level, TILE_SIZE), TILE_SIZE)
+            report[path] = compare_resolver(world, animations, recording)
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        sys.exit(any(result["mismatched_steps"] for result in report.values()))
+
+    report = run(args.widths, args.densities, args.frames)
+    if args.output:
+        with open(args.output, "w") as json_out:
+            json.dump(report, json_out, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,130 @@
+import pygame
+
+
+class CollisionGrid():
+    """
+    A spatial hash of sprites keyed by tile cell.
+
+    Attributes:
+        cell_size (int): The width and height of a cell in pixels.
+        cells (dict): A dictionary mapping (column, row) cells to the sprites overlapping them.
+
+    Methods:
+        __init__(self, cell_size): Initializes an empty grid.
+        add(self, sprite, order): Adds a sprite to every cell its rect overlaps.
+        extend(self, sprites): Adds a list of sprites in order.
+        remove(self, sprite): Removes a sprite from the grid.
+        query(self, rect): Returns the sprites in the cells a rect overlaps.
+    """
+
+    def __init__(self, cell_size: int):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.order = {}
+        self.count = 0
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def __iter__(self):
+        return iter(sorted(self.order, key=self.order.get))
+
+    def cell_range(self, rect: pygame.Rect) -> tuple:
+        """
+        Returns the range of cells a rect overlaps.
+
+        Args:
+            rect (pygame.Rect): The rect to look up.
+
+        Returns:
+            A tuple of (first_column, last_column, first_row, last_row).
+        """
+
+        return (
+            rect.left // self.cell_size,
+            (rect.right - 1) // self.cell_size,
+            rect.top // self.cell_size,
+            (rect.bottom - 1) // self.cell_size,
+        )
+
+    def add(self, sprite: pygame.sprite.Sprite, order=None) -> None:
+        """
+        Adds a sprite to every cell its rect overlaps.
+
+        Args:
+            sprite (pygame.sprite.Sprite): The sprite to add.
+            order: The key query() sorts the sprite by, the order of addition by default.
+                All the sprites of a grid must use the same kind of key.
+
+        Returns:
+            None
+        """
+
+        self.order[sprite] = self.count if order is None else order
+        self.count += 1
+        first_column, last_column, first_row, last_row = self.cell_range(sprite.rect)
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                self.cells.setdefault((column, row), []).append(sprite)
+
+    def extend(self, sprites: list) -> None:
+        """
+        Adds a list of sprites in order.
+
+        Args:
+            sprites (list): The sprites to add.
+
+        Returns:
+            None
+        """
+
+        for sprite in sprites:
+            self.add(sprite)
+
+    def remove(self, sprite: pygame.sprite.Sprite) -> None:
+        """
+        Removes a sprite from the grid.
+
+        Args:
+            sprite (pygame.sprite.Sprite): The sprite to remove.
+
+        Returns:
+            None
+        """
+
+        if sprite not in self.order:
+            return
+        del self.order[sprite]
+        first_column, last_column, first_row, last_row = self.cell_range(sprite.rect)
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                cell = self.cells.get((column, row))
+                if cell and sprite in cell:
+                    cell.remove(sprite)
+                    if not cell:
+                        del self.cells[(column, row)]
+
+    def query(self, rect: pygame.Rect) -> list:
+        """
+        Returns the sprites in the cells a rect overlaps.
+
+        The sprites are returned in the order they were added, or by the keys
+        given to add(), so the first match of a scan over the result is the same
+        as a scan over the full list.
+
+        Args:
+            rect (pygame.Rect): The area to look up.
+
+        Returns:
+            A list of sprites.
+        """
+
+        found = set()
+        first_column, last_column, first_row, last_row = self.cell_range(rect)
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                cell = self.cells.get((column, row))
+                if cell:
+                    found.update(cell)
+
+        return sorted(found, key=self.order.__getitem__)
@@ -0,0 +1,149 @@
+import numpy as np
+import pygame
+from assets import get_tile
+
+
+class EntitySystem():
+    """
+    Moving entities, such as patrolling enemies, stored as arrays with one row per entity.
+
+    Every entity moves in a straight line at its velocity and turns back when
+    it leaves its patrol box. All the entities are moved and tested against a
+    rect with a few array operations, so the cost barely grows with their
+    number; only the entities whose box overlaps the rect are checked pixel
+    by pixel.
+
+    Attributes:
+        tile_size (int): The width and height of an entity in pixels.
+        count (int): The number of entities.
+        position (np.ndarray): The (x, y) of the top left corner of each entity.
+        previous (np.ndarray): The position of each entity before the last update.
+        velocity (np.ndarray): The (x, y) velocity of each entity in pixels per step.
+        low (np.ndarray): The smallest (x, y) of each entity's patrol box.
+        high (np.ndarray): The largest (x, y) of each entity's patrol box.
+        tile_number (np.ndarray): The tile drawn for each entity.
+
+    Methods:
+        __init__(self, tile_size, capacity): Initializes an empty system.
+        add(self, tile_number, x, y, velocity, low, high): Adds an entity.
+        update(self): Moves every entity by one step.
+        collide(self, rect, mask): Returns the entities overlapping a rect.
+        draw(self, window, offset_x, alpha): Draws the entities on screen.
+    """
+
+    def __init__(self, tile_size: int, capacity: int = 64):
+        self.tile_size = tile_size
+        self.count = 0
+        self.position = np.zeros((capacity, 2))
+        self.previous = np.zeros((capacity, 2))
+        self.velocity = np.zeros((capacity, 2))
+        self.low = np.zeros((capacity, 2))
+        self.high = np.zeros((capacity, 2))
+        self.tile_number = np.zeros(capacity, dtype=np.int8)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, tile_number: int, x: float, y: float, velocity: tuple = (0, 0), low: tuple = None, high: tuple = None) -> int:
+        """
+        Adds an entity.
+
+        Args:
+            tile_number (int): The tile to draw the entity with.
+            x (float): The x-coordinate of the entity's top left corner.
+            y (float): The y-coordinate of the entity's top left corner.
+            velocity (tuple): The (x, y) velocity of the entity in pixels per step.
+            low (tuple): The smallest (x, y) of the patrol box, the start position by default.
+            high (tuple): The largest (x, y) of the patrol box, the start position by default.
+
+        Returns:
+            The index of the entity.
+        """
+
+        if self.count == len(self.position):
+            for name in ("position", "previous", "velocity", "low", "high", "tile_number"):
+                array = getattr(self, name)
+                setattr(self, name, np.concatenate((array, np.zeros_like(array))))
+
+        i = self.count
+        self.position[i] = self.previous[i] = (x, y)
+        self.velocity[i] = velocity
+        self.low[i] = low if low is not None else (x, y)
+        self.high[i] = high if high is not None else (x, y)
+        self.tile_number[i] = tile_number
+        self.count += 1
+
+        return i
+
+    def update(self) -> None:
+        """
+        Moves every entity by its velocity, turning back the ones that left their patrol box.
+        """
+
+        if not self.count:
+            return
+
+        n = self.count
+        position, velocity, low, high = self.position[:n], self.velocity[:n], self.low[:n], self.high[:n]
+        self.previous[:n] = position
+        position += velocity
+        np.negative(velocity, out=velocity, where=(position < low) | (position > high))
+        np.maximum(position, low, out=position)
+        np.minimum(position, high, out=position)
+
+    def collide(self, rect: pygame.Rect, mask: pygame.mask.Mask = None) -> np.ndarray:
+        """
+        Returns the entities overlapping a rect, and its mask if one is given.
+
+        Args:
+            rect (pygame.Rect): The area to test, in level coordinates.
+            mask (pygame.mask.Mask): The mask of the area, or None to test the boxes only.
+
+        Returns:
+            An array of the indices of the overlapping entities.
+        """
+
+        if not self.count:
+            return np.empty(0, dtype=np.intp)
+
+        x, y = self.position[:self.count].T
+        hits = np.flatnonzero(
+            (x < rect.right) & (x + self.tile_size > rect.left)
+            & (y < rect.bottom) & (y + self.tile_size > rect.top)
+        )
+        if mask is None or not len(hits):
+            return hits
+
+        return hits[[
+            mask.overlap(get_tile(int(self.tile_number[i]), self.tile_size)[1], (int(x[i]) - rect.x, int(y[i]) - rect.y)) is not None
+            for i in hits
+        ]]
+
+    def draw(self, window: pygame.Surface, offset_x: int, alpha: float = 1.0) -> pygame.Rect:
+        """
+        Draws the entities that are on screen.
+
+        Args:
+            window (pygame.Surface): The surface to draw on.
+            offset_x (int): The x-offset of the screen.
+            alpha (float): How far to draw the entities between their previous and current position, from 0 to 1.
+
+        Returns:
+            The area of the window that was drawn on, or None if no entity is on screen.
+        """
+
+        if not self.count:
+            return None
+
+        previous = self.previous[:self.count]
+        x, y = (previous + (self.position[:self.count] - previous) * alpha).round().T
+        visible = np.flatnonzero((x + self.tile_size > offset_x) & (x < offset_x + window.get_width()))
+        if not len(visible):
+            return None
+
+        rects = window.blits([
+            (get_tile(int(self.tile_number[i]), self.tile_size)[0], (int(x[i]) - offset_x, int(y[i])))
+            for i in visible
+        ])
+
+        return rects[0].unionall(rects[1:])
@@ -0,0 +1,114 @@
+from array import array
+
+
+class EditJournal():
+    """
+    An undo and redo history of level edits, kept as cell deltas grouped per mouse stroke.
+
+    Each stroke is a flat array of (row, column, old, new) integers, so the
+    memory used grows with the number of edited cells, not with the size of
+    the level.
+
+    Attributes:
+        stroke (array): The deltas of the stroke in progress.
+        undo_stack (list): The finished strokes that can be undone, oldest first.
+        redo_stack (list): The undone strokes that can be redone, most recently undone last.
+
+    Methods:
+        __init__(self): Initializes an empty journal.
+        record(self, row, column, old, new): Adds a cell change to the stroke in progress.
+        end_stroke(self): Closes the stroke in progress.
+        undo(self, level_data): Reverts the last stroke.
+        redo(self, level_data): Applies the last undone stroke again.
+        clear(self): Forgets the whole history.
+    """
+
+    def __init__(self):
+        self.stroke = array("i")
+        self.undo_stack = []
+        self.redo_stack = []
+
+    def record(self, row: int, column: int, old: int, new: int) -> None:
+        """
+        Adds a cell change to the stroke in progress.
+
+        Args:
+            row (int): The row of the cell.
+            column (int): The column of the cell.
+            old (int): The tile number before the change.
+            new (int): The tile number after the change.
+
+        Returns:
+            None
+        """
+
+        self.stroke.extend((row, column, old, new))
+
+    def end_stroke(self) -> None:
+        """
+        Closes the stroke in progress, making it the next one to undo.
+        """
+
+        if self.stroke:
+            self.undo_stack.append(self.stroke)
+            self.redo_stack.clear()
+            self.stroke = array("i")
+
+    def undo(self, level_data) -> list:
+        """
+        Reverts the last stroke.
+
+        Args:
+            level_data: The Level or list of rows the stroke was made on.
+
+        Returns:
+            A list of the (column, row) cells that changed.
+        """
+
+        self.end_stroke()
+        if not self.undo_stack:
+            return []
+
+        stroke = self.undo_stack.pop()
+        self.redo_stack.append(stroke)
+        changed = []
+        for i in range(len(stroke) - 4, -1, -4):
+            row, column, old, _ = stroke[i:i + 4]
+            level_data[row][column] = old
+            changed.append((column, row))
+
+        return changed
+
+    def redo(self, level_data) -> list:
+        """
+        Applies the last undone stroke again.
+
+        Args:
+            level_data: The Level or list of rows the stroke was made on.
+
+        Returns:
+            A list of the (column, row) cells that changed.
+        """
+
+        self.end_stroke()
+        if not self.redo_stack:
+            return []
+
+        stroke = self.redo_stack.pop()
+        self.undo_stack.append(stroke)
+        changed = []
+        for i in range(0, len(stroke), 4):
+            row, column, _, new = stroke[i:i + 4]
+            level_data[row][column] = new
+            changed.append((column, row))
+
+        return changed
+
+    def clear(self) -> None:
+        """
+        Forgets the whole history.
+        """
+
+        self.stroke = array("i")
+        self.undo_stack.clear()
+        self.redo_stack.clear()
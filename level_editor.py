@@ -1,33 +1,31 @@
 import pygame
 import button
-import pickle
+from assets import check_formats, get_asset, get_font, get_image, get_tile, render_text
+from journal import EditJournal
+from levels import Level, LevelWorker, newest_copy
+from profiler import FrameProfiler
+from render import Backdrop, TileLayer
 
 def draw_text(window, text, font, text_color, x, y):
-    image = font.render(text, True, text_color)
+    image = render_text(text, font, text_color)
     window.blit(image, (x, y))
 
-def draw_background(window, color, background, width, scroll):
-    window.fill(color)
-    for x in range(6):
-        window.blit(background, ((x * width) - scroll, 0))
+def draw_background(window, backdrop, width, scroll):
+    backdrop.draw(window, scroll, width)
 
-def draw_grid(window, color, columns, rows, width, height, tile_size, scroll):
-    for c in range(columns + 1):
-        pygame.draw.line(window, color, (c * tile_size - scroll, 0), (c * tile_size - scroll, height))
 
-    for c in range(rows + 1):
-        pygame.draw.line(window, color, (0, c * tile_size), (width, c * tile_size))
+def draw_level(window, tile_layer, width, scroll):
+    tile_layer.draw(window, scroll, width)
 
 
-def draw_level(window, level_data, tiles, tile_size, scroll):
-    for y, row in enumerate(level_data):
-        for x, tile in enumerate(row):
-            if tile > -1:
-                window.blit(tiles[tile], (x * tile_size - scroll, y * tile_size))
+def get_backdrop(color, background, grid_color, columns, rows, tile_size, height):
+    repeats = -(-columns * tile_size // background.get_width())
+    key = ("backdrop", color, background.get_size(), grid_color, columns, rows, tile_size, height)
+    return get_asset(key, lambda: Backdrop(color, background, grid_color, columns, rows, tile_size, height, repeats))
 
 
 
-def edit_level(width, height, lower_margin, side_margin):
+def edit_level(width, height, lower_margin, side_margin, profiler=None, autosave_seconds=None):
 
     clock = pygame.time.Clock()
     FPS = 60
@@ -40,7 +38,8 @@ def edit_level(width, height, lower_margin, side_margin):
     TILE_SIZE = height // ROWS
     TILE_TYPES = 19
 
-    font = pygame.font.SysFont("Futura", 30)
+    profiler = profiler or FrameProfiler()
+    font = get_font("Futura", 30)
     current_tile = 0
     level = 0
     scroll_left = False
@@ -51,23 +50,25 @@ def edit_level(width, height, lower_margin, side_margin):
     window = pygame.display.set_mode((width + side_margin, height + lower_margin))
     pygame.display.set_caption("Level Editor")
 
-    background = pygame.image.load("Background/background.png").convert_alpha()
-    background = pygame.transform.scale(background, (width, height))
+    background = get_image("Background/background.png", (width, height), False)
+    backdrop = get_backdrop(BACKGROUND_COLOR, background, GRAY, MAX_COLUMNS, ROWS, TILE_SIZE, height + lower_margin)
 
-    tiles = []
-    for i in range(TILE_TYPES):
-        image = pygame.image.load(f"Tiles/{i}.png").convert_alpha()
-        image = pygame.transform.scale(image, (TILE_SIZE, TILE_SIZE))
-        tiles.append(image)
+    tiles = [get_tile(i, TILE_SIZE)[0] for i in range(TILE_TYPES)]
 
-    save_image = pygame.image.load("Buttons/save.png").convert_alpha()
-    load_image = pygame.image.load("Buttons/load.png").convert_alpha()
-    back_image = pygame.image.load("Buttons/back.png").convert_alpha()
+    save_image = get_image("Buttons/save.png")
+    load_image = get_image("Buttons/load.png")
+    back_image = get_image("Buttons/back.png")
 
-    level_data = []
-    for _ in range(ROWS):
-        r = [-1] * MAX_COLUMNS
-        level_data.append(r)
+    level_data = Level.empty(ROWS, MAX_COLUMNS)
+    tile_layer = TileLayer(level_data, tiles, TILE_SIZE)
+    journal = EditJournal()
+    worker = LevelWorker()
+    pending_save = None
+    pending_load = None
+    pending_autosave = None
+    revision = 0
+    autosaved_revision = 0
+    autosave_time = pygame.time.get_ticks()
 
     save_button = button.Button(width // 2, height + lower_margin - 75, save_image, 1)
     load_button = button.Button(width // 2 + 200, height + lower_margin - 75, load_image, 1)
@@ -84,46 +85,75 @@ def edit_level(width, height, lower_margin, side_margin):
             button_row += 1
             button_column = 0
 
+    surfaces = {"save button": save_button.image, "load button": load_button.image, "back button": back_button.image}
+    surfaces.update((f"tile button {i}", tile_button.image) for i, tile_button in enumerate(button_list))
+
     save_count = 0
     load_count = 0
     run = True
     while run:
-        
+        profiler.start_frame()
         clock.tick(FPS)
-        draw_background(window, BACKGROUND_COLOR, background, width, scroll)
-        draw_grid(window, GRAY, MAX_COLUMNS, ROWS, width, height, TILE_SIZE, scroll)
-        draw_level(window, level_data, tiles, TILE_SIZE, scroll)
+        profiler.mark("tick")
+        check_formats(surfaces)
+        draw_background(window, backdrop, width, scroll)
+        draw_level(window, tile_layer, width, scroll)
 
         draw_text(window, f"Level: {level}", font, WHITE, 10, height + lower_margin - 90)
         draw_text(window, "Press LEFT or RIGHT to scroll  //  Hold SHIFT to scroll faster", font, WHITE, 10, height + lower_margin - 60)
         draw_text(window, "Press UP or DOWN to change level", font, WHITE, 10, height + lower_margin - 30)
         draw_text(window, "Left-click to draw", font, WHITE, width - side_margin + 80, height + lower_margin - 70)
         draw_text(window, "Right-click to delete", font, WHITE, width - side_margin + 80, height + lower_margin - 40)
+        draw_text(window, "Ctrl+Z / Ctrl+Y to undo / redo", font, WHITE, width - side_margin + 80, height + lower_margin - 100)
+
+        profiler.mark("draw")
 
         if back_button.draw(window):
+            worker.close()
             window = pygame.display.set_mode((width, height))
             run = False
             return True
-        if save_button.draw(window):
-            with open(f"Levels/level_{level}", "wb") as pickle_out:
-                pickle.dump(level_data, pickle_out)
+        if save_button.draw(window) and not pending_save:
+            pending_save = (level, worker.save(f"Levels/level_{level}", level_data))
+        if pending_save and pending_save[1].done():
+            saved_level, future = pending_save
+            message = f"Level_{saved_level} saved successfully"
+            if future.exception():
+                message = f"Level_{saved_level} could not be saved"
+            pending_save = None
             load_count = 0
             save_count = 120
         if save_count != 0:
-            draw_text(window, f"Level_{level} saved successfully", font, WHITE, width // 2 + 50, height + lower_margin - 25)
+            draw_text(window, message, font, WHITE, width // 2 + 50, height + lower_margin - 25)
             save_count -= 1
 
-        if load_button.draw(window):
-            scroll = 0
-            level_data = []
-            pickle_in = open(f"Levels/level_{level}", "rb")
-            level_data = pickle.load(pickle_in)
+        if load_button.draw(window) and not pending_load:
+            load_path = newest_copy(f"Levels/level_{level}")
+            pending_load = (level, load_path.endswith(".autosave"), worker.load(load_path))
+        if pending_load and pending_load[2].done():
+            loaded_level, from_autosave, future = pending_load
+            message = f"Level_{loaded_level} could not be loaded"
+            if not future.exception():
+                message = f"Level_{loaded_level} loaded" + (" from autosave" if from_autosave else "")
+                scroll = 0
+                level_data = future.result()
+                tile_layer = TileLayer(level_data, tiles, TILE_SIZE)
+                backdrop = get_backdrop(BACKGROUND_COLOR, background, GRAY, level_data.columns, ROWS, TILE_SIZE, height + lower_margin)
+                journal.clear()
+                revision = autosaved_revision = 0
+            pending_load = None
             save_count = 0
             load_count = 120
         if load_count != 0:
-            draw_text(window, f"Level_{level} loaded", font, WHITE, width // 2 + 50, height + lower_margin - 25)
+            draw_text(window, message, font, WHITE, width // 2 + 50, height + lower_margin - 25)
             load_count -= 1
 
+        if autosave_seconds and pygame.time.get_ticks() - autosave_time >= autosave_seconds * 1000:
+            autosave_time = pygame.time.get_ticks()
+            if revision != autosaved_revision and not (pending_autosave and not pending_autosave.done()):
+                pending_autosave = worker.save(f"Levels/level_{level}.autosave", level_data)
+                autosaved_revision = revision
+
 
         pygame.draw.rect(window, BACKGROUND_COLOR, (width, 0, side_margin, height + 1))
 
@@ -132,21 +162,31 @@ def edit_level(width, height, lower_margin, side_margin):
                 current_tile = button_count
 
         pygame.draw.rect(window, RED, button_list[current_tile].rect, 3)
+        profiler.mark("buttons")
 
         if scroll_left and scroll > 0:
             scroll -= 5 * scroll_speed
-        if scroll_right and scroll < (MAX_COLUMNS * TILE_SIZE) - width:
+        if scroll_right and scroll < (level_data.columns * TILE_SIZE) - width:
             scroll += 5 * scroll_speed
 
         pos = pygame.mouse.get_pos()
         x = (pos[0] + scroll) // TILE_SIZE
         y = pos[1] // TILE_SIZE
 
-        if pos[0] < width and pos[1] < height:
+        if pos[0] < width and pos[1] < height and x < level_data.columns and y < level_data.rows:
             if pygame.mouse.get_pressed()[0] and level_data[y][x] != current_tile:
+                journal.record(y, x, level_data[y][x], current_tile)
                 level_data[y][x] = current_tile
-            if pygame.mouse.get_pressed()[2]:
+                tile_layer.paint(x, y)
+                revision += 1
+            if pygame.mouse.get_pressed()[2] and level_data[y][x] != -1:
+                journal.record(y, x, level_data[y][x], -1)
                 level_data[y][x] = -1
+                tile_layer.paint(x, y)
+                revision += 1
+        if not pygame.mouse.get_pressed()[0] and not pygame.mouse.get_pressed()[2]:
+            journal.end_stroke()
+        profiler.mark("input")
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -164,6 +204,16 @@ def edit_level(width, height, lower_margin, side_margin):
                     scroll_right = True
                 if event.key in [pygame.K_LSHIFT, pygame.K_RSHIFT]:
                     scroll_speed = 5
+                if event.key == pygame.K_F3:
+                    profiler.toggle()
+                if pygame.key.get_mods() & pygame.KMOD_CTRL and event.key in [pygame.K_z, pygame.K_y]:
+                    if event.key == pygame.K_z and not pygame.key.get_mods() & pygame.KMOD_SHIFT:
+                        changed = journal.undo(level_data)
+                    else:
+                        changed = journal.redo(level_data)
+                    for cell in changed:
+                        tile_layer.paint(*cell)
+                    revision += len(changed)
 
             if event.type == pygame.KEYUP:
                 if event.key == pygame.K_LEFT:
@@ -172,11 +222,16 @@ def edit_level(width, height, lower_margin, side_margin):
                     scroll_right = False
                 if event.key in [pygame.K_LSHIFT, pygame.K_RSHIFT]:
                     scroll_speed = 1
+        profiler.mark("events")
 
-
+        profiler.draw(window)
         pygame.display.update()
+        profiler.mark("display_update")
+        profiler.end_frame()
 
 
+    worker.close()
+    profiler.dump()
     pygame.quit()
     quit()
 
@@ -0,0 +1,462 @@
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+import zlib
+from array import array
+from concurrent.futures import Future, ThreadPoolExecutor
+from os import listdir
+from os.path import dirname, isfile, join
+
+
+TILE_KINDS = [
+    "tile", "tile", "tile", "tile", "tile", "tile", "tile", "tile", "tile", "tile",
+    "tile", "tile", "water", "water", "enemy", "tile", "tile", "tile", "enemy",
+]
+
+MAGIC = b"RUSH"
+VERSION = 1
+HEADER = struct.Struct("<4sBHII")
+TILE_TABLE_HASH = zlib.crc32(",".join(TILE_KINDS).encode())
+
+
+class Level():
+    """
+    A grid of tile numbers stored as one contiguous block of int8 cells.
+
+    Indexing a level returns a row that can be read and written like a list,
+    so level[y][x] works as it does on a list of lists.
+
+    Attributes:
+        rows (int): The number of rows.
+        columns (int): The number of columns.
+        cells (memoryview): The cells, row after row, -1 for an empty cell.
+
+    Methods:
+        __init__(self, rows, columns, cells): Initializes a level over a buffer of cells.
+        empty(rows, columns): Returns a writable level with every cell empty.
+        copy(self): Returns a writable copy of the level.
+    """
+
+    def __init__(self, rows: int, columns: int, cells):
+        self.rows = rows
+        self.columns = columns
+        self.cells = memoryview(cells).cast("B").cast("b")
+
+    @staticmethod
+    def empty(rows: int, columns: int):
+        """
+        Returns a writable level with every cell empty.
+
+        Args:
+            rows (int): The number of rows.
+            columns (int): The number of columns.
+
+        Returns:
+            A Level.
+        """
+
+        return Level(rows, columns, array("b", [-1]) * (rows * columns))
+
+    def copy(self):
+        """
+        Returns a writable copy of the level.
+
+        Returns:
+            A Level.
+        """
+
+        cells = array("b")
+        cells.frombytes(self.cells.tobytes())
+
+        return Level(self.rows, self.columns, cells)
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __getitem__(self, y: int) -> memoryview:
+        if not -self.rows <= y < self.rows:
+            raise IndexError("level row out of range")
+        y %= self.rows
+        return self.cells[y * self.columns:(y + 1) * self.columns]
+
+    def __iter__(self):
+        for y in range(self.rows):
+            yield self[y]
+
+
+def read_header(path: str) -> tuple:
+    """
+    Reads the header of a level file.
+
+    Args:
+        path (str): The path of the level file.
+
+    Returns:
+        A tuple of (rows, columns), or None if the file is not a level file of this version and tile table.
+    """
+
+    with open(path, "rb") as level_in:
+        header = level_in.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return None
+
+    magic, version, rows, columns, tile_table_hash = HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION or tile_table_hash != TILE_TABLE_HASH:
+        return None
+
+    return rows, columns
+
+
+def load_level(path: str, writable: bool = False) -> Level:
+    """
+    Loads a level file.
+
+    A read-only level is memory-mapped, so no object is created per cell.
+
+    Args:
+        path (str): The path of the level file.
+        writable (bool): Whether the returned level can be edited.
+
+    Returns:
+        A Level.
+
+    Raises:
+        ValueError: If the file is not a level file of this version and tile table.
+    """
+
+    size = read_header(path)
+    if size is None:
+        raise ValueError(f"{path} is not a version {VERSION} level file for this tile table")
+    rows, columns = size
+
+    with open(path, "rb") as level_in:
+        if writable:
+            level_in.seek(HEADER.size)
+            cells = array("b")
+            cells.frombytes(level_in.read(rows * columns))
+        else:
+            cells = memoryview(mmap.mmap(level_in.fileno(), 0, access=mmap.ACCESS_READ))
+            cells = cells[HEADER.size:HEADER.size + rows * columns]
+
+    if len(cells) != rows * columns:
+        raise ValueError(f"{path} is truncated")
+
+    return Level(rows, columns, cells)
+
+
+def write_file(path: str, data: bytes) -> None:
+    """
+    Writes a file through a temporary file that then replaces it, so a crash never leaves it half-written.
+
+    The temporary file is synced to disk before the rename, so a power loss
+    cannot leave an empty or partly written file in its place.
+
+    Args:
+        path (str): The path of the file.
+        data (bytes): The contents of the file.
+
+    Returns:
+        None
+    """
+
+    descriptor, temporary_path = tempfile.mkstemp(dir=dirname(path) or ".", prefix=".level_")
+    try:
+        with os.fdopen(descriptor, "wb") as file_out:
+            file_out.write(data)
+            file_out.flush()
+            os.fsync(file_out.fileno())
+        os.chmod(temporary_path, 0o644)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+
+
+def save_level(path: str, level_data) -> None:
+    """
+    Saves a level grid to a level file.
+
+    The grid is written to a temporary file that then replaces the level
+    file, so a crash never leaves a half-written level behind.
+
+    Args:
+        path (str): The path of the level file.
+        level_data: A Level or a list of rows of tile numbers.
+
+    Returns:
+        None
+    """
+
+    rows = len(level_data)
+    columns = len(level_data[0])
+    if isinstance(level_data, Level):
+        cells = level_data.cells.tobytes()
+    else:
+        cells = array("b", [tile for row in level_data for tile in row]).tobytes()
+
+    write_file(path, HEADER.pack(MAGIC, VERSION, rows, columns, TILE_TABLE_HASH) + cells)
+
+
+class LevelWorker():
+    """
+    Saves and loads level files on a background thread, one at a time and in order.
+
+    Methods:
+        __init__(self): Starts the worker thread.
+        save(self, path, level_data): Saves a snapshot of a level in the background.
+        load(self, path): Loads a writable level in the background.
+        close(self): Waits for the pending saves and loads and stops the thread.
+    """
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def save(self, path: str, level_data: Level) -> Future:
+        """
+        Saves a snapshot of a level in the background, so later edits do not change what is written.
+
+        Args:
+            path (str): The path of the level file.
+            level_data (Level): The level to save.
+
+        Returns:
+            A Future that is done when the file is written.
+        """
+
+        return self.executor.submit(save_level, path, level_data.copy())
+
+    def load(self, path: str) -> Future:
+        """
+        Loads a writable level in the background.
+
+        Args:
+            path (str): The path of the level file.
+
+        Returns:
+            A Future whose result is the loaded Level.
+        """
+
+        return self.executor.submit(load_level, path, True)
+
+    def close(self) -> None:
+        """
+        Waits for the pending saves and loads and stops the thread.
+        """
+        self.executor.shutdown(wait=True)
+
+
+def newest_copy(path: str) -> str:
+    """
+    Returns the path of a level file or of its autosave, whichever was written last.
+
+    Args:
+        path (str): The path of the level file.
+
+    Returns:
+        The path of the autosave if it is newer than the level file or the level file is missing,
+        the path of the level file otherwise.
+    """
+
+    autosave_path = f"{path}.autosave"
+    try:
+        autosave_mtime = os.stat(autosave_path).st_mtime_ns
+    except OSError:
+        return path
+
+    try:
+        if os.stat(path).st_mtime_ns >= autosave_mtime:
+            return path
+    except OSError:
+        pass
+
+    return autosave_path
+
+
+def list_levels(path: str = "Levels") -> list:
+    """
+    Returns the numbers of the level files in a directory.
+
+    Args:
+        path (str): The directory of the level files.
+
+    Returns:
+        A sorted list of level numbers.
+    """
+
+    numbers = []
+    for name in listdir(path):
+        number = name.removeprefix("level_")
+        if number.isdigit() and isfile(join(path, name)) and read_header(join(path, name)):
+            numbers.append(int(number))
+
+    return sorted(numbers)
+
+
+def level_hash(path: str) -> str:
+    """
+    Returns the SHA-1 of a level file.
+
+    Args:
+        path (str): The path of the level file.
+
+    Returns:
+        The hexadecimal digest.
+    """
+
+    with open(path, "rb") as level_in:
+        return hashlib.sha1(level_in.read()).hexdigest()
+
+
+def describe_level(path: str) -> dict:
+    """
+    Returns the metadata of a level file.
+
+    Args:
+        path (str): The path of the level file.
+
+    Returns:
+        A dictionary with "rows", "columns", "tiles" (the number of cells of each tile kind),
+        "hash" (the SHA-1 of the file), "mtime" and "size", or None if the file is not a valid level file.
+    """
+
+    try:
+        level_data = load_level(path)
+        content_hash = level_hash(path)
+    except (OSError, ValueError):
+        return None
+
+    cells = level_data.cells.tobytes()
+    tiles = dict.fromkeys(sorted(set(TILE_KINDS)), 0)
+    for tile_number, kind in enumerate(TILE_KINDS):
+        tiles[kind] += cells.count(tile_number)
+    stat = os.stat(path)
+
+    return {
+        "rows": level_data.rows,
+        "columns": level_data.columns,
+        "tiles": tiles,
+        "hash": content_hash,
+        "mtime": stat.st_mtime_ns,
+        "size": stat.st_size,
+    }
+
+
+class LevelCatalog():
+    """
+    The level files of a directory and their metadata, rescanned only when the directory changes.
+
+    The metadata is kept in an index file in the directory, so a level is
+    only read again when its modification time or size changes.
+
+    Attributes:
+        INDEX (str): The name of the index file.
+        path (str): The directory of the level files.
+        levels (dict): A dictionary mapping level numbers to their metadata, sorted by number.
+
+    Methods:
+        __init__(self, path): Initializes an empty catalog of a directory.
+        refresh(self): Rescans the directory if it changed since the last scan.
+        numbers(self): Returns the sorted level numbers.
+    """
+
+    INDEX = ".catalog.json"
+
+    def __init__(self, path: str = "Levels"):
+        self.path = path
+        self.levels = {}
+        self.mtime = None
+
+    def read_index(self) -> dict:
+        """
+        Reads the index file of the directory.
+
+        Returns:
+            A dictionary mapping level numbers to their metadata, empty if there is no readable index.
+        """
+
+        try:
+            with open(join(self.path, self.INDEX)) as index_in:
+                return {int(number): entry for number, entry in json.load(index_in).items()}
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+    def refresh(self) -> bool:
+        """
+        Rescans the directory if its modification time changed since the last scan.
+
+        Returns:
+            True if the directory was rescanned, False otherwise.
+        """
+
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime == self.mtime:
+            return False
+
+        known = self.levels if self.mtime is not None else self.read_index()
+        levels = {}
+        for name in listdir(self.path):
+            number = name.removeprefix("level_")
+            level_path = join(self.path, name)
+            if not number.isdigit() or not isfile(level_path):
+                continue
+            entry = known.get(int(number))
+            stat = os.stat(level_path)
+            if entry is None or "hash" not in entry or (entry["mtime"], entry["size"]) != (stat.st_mtime_ns, stat.st_size):
+                entry = describe_level(level_path)
+            if entry is not None:
+                levels[int(number)] = entry
+
+        self.levels = dict(sorted(levels.items()))
+        if self.levels != known:
+            try:
+                write_file(join(self.path, self.INDEX), json.dumps(self.levels, indent=2).encode())
+            except OSError:
+                pass
+        self.mtime = os.stat(self.path).st_mtime_ns
+
+        return True
+
+    def numbers(self) -> list:
+        """
+        Returns the sorted level numbers.
+
+        Returns:
+            A list of level numbers.
+        """
+
+        return list(self.levels)
+
+
+def migrate_levels(path: str = "Levels") -> list:
+    """
+    Converts the pickled level files of a directory to the binary format, in place.
+
+    Only run this on trusted files, since loading a pickle can run arbitrary code.
+
+    Args:
+        path (str): The directory of the level files.
+
+    Returns:
+        A list of the converted file names.
+    """
+
+    converted = []
+    for name in sorted(listdir(path)):
+        level_path = join(path, name)
+        if not name.startswith("level_") or not isfile(level_path) or read_header(level_path):
+            continue
+        with open(level_path, "rb") as pickle_in:
+            level_data = pickle.load(pickle_in)
+        save_level(level_path, level_data)
+        converted.append(name)
+
+    return converted
+
+
+if __name__ == "__main__":
+    for name in migrate_levels():
+        print(f"Converted {name}")
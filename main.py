@@ -1,24 +1,34 @@
+from time import perf_counter
+start_time = perf_counter()
+
 import pygame
 import button
 import level_editor
 import play
 from os import listdir
+from os.path import join
+from assets import check_formats, convert_decoded, get_font, get_image, preload, render_text, set_format_check
+from levels import LevelCatalog
+from profiler import FrameProfiler
+from render import DirtyRects
+from thumbnails import ThumbnailCache
 
 
 def draw_background(background: pygame.image) -> None:
+    check_formats({"menu background": background})
     window.blit(background, (0, 0))
 
 def draw_text(text: str, size: int, font: str, text_color: tuple, x: int, y: int) -> None:
-    font = pygame.font.SysFont(f"{font}", size)
-    image = font.render(text, True, text_color)
+    image = render_text(text, get_font(font, size), text_color)
+    check_formats({f"text {text!r}": image})
     window.blit(image, (x, y))
 
-def create_buttons(path: str) -> list:
+def create_buttons(numbers: list) -> list:
     button_list = []
     text_list = []
     button_column = 0
     button_row = 0
-    for i in range(len(listdir(path))):
+    for i in numbers:
         level_button = button.Button(WIDTH // 3 + (75 * button_column), 75 * button_row + 405, level_image, 1)
         button_list.append(level_button)
         text_list.append([f"{i}", 50, "Futura", WHITE, WIDTH // 3 + (75 * button_column) + 17, 75 * button_row + 410])
@@ -41,88 +51,146 @@ TILE_TYPES = 19
 WHITE = (255, 255, 255)
 GRAY = (115, 115, 115)
 RED = (205, 20, 20)
-
-level = 0
-
-window = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Rush")
-
-background = pygame.image.load("Background/background.png").convert_alpha()
-background = pygame.transform.scale(background, (WIDTH, HEIGHT))
-
-play_image = pygame.image.load("Buttons/play.png").convert_alpha()
-level_editor_image = pygame.image.load("Buttons/level_editor.png").convert_alpha()
-quit_image = pygame.image.load("Buttons/quit.png").convert_alpha()
-level_image = pygame.image.load("Buttons/level.png").convert_alpha()
-
-play_button = button.Button(WIDTH // 2.2, HEIGHT // 2, play_image, 1)
-level_editor_button = button.Button(WIDTH // 2.2, HEIGHT // 2 + 75, level_editor_image, 1)
-quit_button = button.Button(WIDTH // 2.2, HEIGHT  // 2 + 150, quit_image, 1)
-
-
-tiles = [pygame.transform.scale(
-    pygame.image.load(f"Tiles/{i}.png").convert_alpha(),(TILE_SIZE, TILE_SIZE)
-    )
-    for i in range(TILE_TYPES)
+DIRTY_RECTS = True
+PROFILE_OUTPUT = None
+STREAM_LEVELS = True
+RENDER_FPS = 60
+RECORD_REPLAY = None
+CHECK_SURFACES = False
+AUTOSAVE_SECONDS = 60
+STARTUP_TIMING = False
+
+MENU_IMAGES = [
+    "Background/background.png",
+    "Buttons/play.png", "Buttons/level_editor.png", "Buttons/quit.png", "Buttons/level.png",
+]
+GAME_IMAGES = [
+    *(f"Tiles/{i}.png" for i in range(TILE_TYPES)),
+    *(join("Player", name) for name in sorted(listdir("Player"))),
+    "Background/life.png", "Buttons/save.png", "Buttons/load.png", "Buttons/back.png",
 ]
 
-
-menu = "main"
-run = True
-while run:
-    pygame.init()
-    clock.tick(FPS)
-    draw_background(background)
-
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            run = False
-            break
-    
-    if menu == "main":
-        pygame.display.set_caption("Rush")
-        draw_text("R U S H", 200, "Futura", GRAY, WIDTH // 3, HEIGHT // 4)
-        draw_text("R U S H", 195, "Futura", RED, WIDTH // 3 + 5, HEIGHT // 4 + 3)
-        if play_button.draw(window):
-            menu = "choose_level"
-
-        if level_editor_button.draw(window):
-            menu = "level_editor"
-    
-        if quit_button.draw(window):
-            run = False
-            break
-
-    elif menu == "choose_level":
-        draw_text("Choose Level", 150, "Futura", GRAY, WIDTH // 4, HEIGHT // 4)
-        draw_text("Choose Level", 149, "Futura", RED, WIDTH // 4 + 3, HEIGHT // 4 + 3)
-
-        button_list, text_list = create_buttons("Levels")
-
-        for button_count, a_button in enumerate(button_list):
-            if a_button.draw(window):
-                level = button_count
-                menu = "play"
-
-            draw_text(text_list[button_count][0],
-                        text_list[button_count][1],
-                        text_list[button_count][2],
-                        text_list[button_count][3],
-                        text_list[button_count][4],
-                        text_list[button_count][5]
-                    )
-
-
-    elif menu == "play":
-        if play.play(WIDTH, HEIGHT, level, TILE_SIZE):
-            menu = "main"
-    
-    elif menu == "level_editor":
-        if level_editor.edit_level(WIDTH, HEIGHT, LOWER_MARGIN, SIDE_MARGIN):
-            menu = "main"
-
-    pygame.display.update()
-
-
-pygame.quit()
-quit()
\ No newline at end of file
+if __name__ == "__main__":
+    level = 0
+
+    window = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Rush")
+
+    preload(MENU_IMAGES + GAME_IMAGES)
+
+    set_format_check(CHECK_SURFACES)
+    background = get_image("Background/background.png", (WIDTH, HEIGHT), False)
+
+    play_image = get_image("Buttons/play.png")
+    level_editor_image = get_image("Buttons/level_editor.png")
+    quit_image = get_image("Buttons/quit.png")
+    level_image = get_image("Buttons/level.png")
+
+    play_button = button.Button(WIDTH // 2.2, HEIGHT // 2, play_image, 1)
+    level_editor_button = button.Button(WIDTH // 2.2, HEIGHT // 2 + 75, level_editor_image, 1)
+    quit_button = button.Button(WIDTH // 2.2, HEIGHT  // 2 + 150, quit_image, 1)
+    button_images = {
+        "play button": play_button.image,
+        "level editor button": level_editor_button.image,
+        "quit button": quit_button.image,
+        "level button": level_image,
+    }
+
+
+    catalog = LevelCatalog("Levels")
+    thumbnails = ThumbnailCache(catalog)
+    button_list, text_list = [], []
+
+    dirty = DirtyRects(DIRTY_RECTS)
+    profiler = FrameProfiler(PROFILE_OUTPUT)
+    menu = "main"
+    drawn_menu = None
+    first_frame = True
+    loading = True
+    run = True
+    while run:
+        pygame.init()
+        clock.tick(FPS)
+        if menu != drawn_menu:
+            dirty.invalidate()
+            drawn_menu = menu
+            if menu == "choose_level" and catalog.refresh():
+                button_list, text_list = create_buttons(catalog.numbers())
+                thumbnails.update()
+        draw_background(background)
+        check_formats(button_images)
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                run = False
+                break
+
+        if menu == "main":
+            pygame.display.set_caption("Rush")
+            draw_text("R U S H", 200, "Futura", GRAY, WIDTH // 3, HEIGHT // 4)
+            draw_text("R U S H", 195, "Futura", RED, WIDTH // 3 + 5, HEIGHT // 4 + 3)
+            if play_button.draw(window):
+                menu = "choose_level"
+
+            if level_editor_button.draw(window):
+                menu = "level_editor"
+
+            if quit_button.draw(window):
+                run = False
+                break
+
+            for a_button in [play_button, level_editor_button, quit_button]:
+                dirty.add(a_button.rect)
+
+        elif menu == "choose_level":
+            draw_text("Choose Level", 150, "Futura", GRAY, WIDTH // 4, HEIGHT // 4)
+            draw_text("Choose Level", 149, "Futura", RED, WIDTH // 4 + 3, HEIGHT // 4 + 3)
+
+            for button_count, a_button in enumerate(button_list):
+                if a_button.draw(window):
+                    level = int(text_list[button_count][0])
+                    menu = "play"
+                dirty.add(a_button.rect)
+
+                if a_button.rect.collidepoint(pygame.mouse.get_pos()):
+                    thumbnail = thumbnails.get(int(text_list[button_count][0]))
+                    if thumbnail:
+                        thumbnail_rect = thumbnail.get_rect(midtop=(WIDTH // 2, 320))
+                        window.fill(GRAY, thumbnail_rect.inflate(8, 8))
+                        window.blit(thumbnail, thumbnail_rect)
+                        dirty.add(thumbnail_rect.inflate(8, 8))
+
+                draw_text(text_list[button_count][0],
+                            text_list[button_count][1],
+                            text_list[button_count][2],
+                            text_list[button_count][3],
+                            text_list[button_count][4],
+                            text_list[button_count][5]
+                        )
+
+
+        elif menu == "play":
+            if play.play(WIDTH, HEIGHT, level, TILE_SIZE, DIRTY_RECTS, profiler, STREAM_LEVELS, RENDER_FPS, RECORD_REPLAY):
+                menu = "main"
+
+        elif menu == "level_editor":
+            if level_editor.edit_level(WIDTH, HEIGHT, LOWER_MARGIN, SIDE_MARGIN, profiler, AUTOSAVE_SECONDS):
+                menu = "main"
+
+        dirty.update()
+
+        if first_frame:
+            first_frame = False
+            if STARTUP_TIMING:
+                print(f"First frame after {(perf_counter() - start_time) * 1000:.1f} ms")
+
+        if loading and not convert_decoded():
+            loading = False
+            if STARTUP_TIMING:
+                print(f"Assets loaded after {(perf_counter() - start_time) * 1000:.1f} ms")
+
+
+    profiler.dump()
+    thumbnails.close()
+    pygame.quit()
+    quit()
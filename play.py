@@ -1,7 +1,14 @@
 import pygame
-import pickle
+from time import perf_counter
 from os import listdir
 from os.path import isfile, join
+from collision import CollisionGrid
+from assets import check_formats, get_asset, get_image, get_tile
+from levels import TILE_KINDS, Level, level_hash, load_level
+from render import ChunkedLayer, DirtyRects
+from profiler import FrameProfiler
+from recording import InputRecorder
+from entities import EntitySystem
 
 
 def flip(sprites: list) -> list:
@@ -36,14 +43,14 @@ def load_sprites(path: str, width: int, height: int, direction: bool = False) ->
     images = [f for f in listdir(path) if isfile(join(path, f))]
     all_sprites = {}
     for image in images:
-        sprite_sheet = pygame.image.load(join(path, image)).convert_alpha()
+        sprite_sheet = get_image(join(path, image))
         
         sprites = []
         for i in range(sprite_sheet.get_width() // width):
             surface = pygame.Surface((width, height), pygame.SRCALPHA, 32)
             rect = pygame.Rect(i * width, 0, width, height)
             surface.blit(sprite_sheet, (0, 0), rect)
-            sprites.append(pygame.transform.scale2x(surface))
+            sprites.append(pygame.transform.scale2x(surface).convert_alpha())
         
         if direction:
             all_sprites[image.replace(".png", "") + "_right"] = sprites
@@ -55,47 +62,66 @@ def load_sprites(path: str, width: int, height: int, direction: bool = False) ->
 
 
 
-def draw_level(window: pygame.display, objects: list, offset_x: int) -> None:
+def get_animations(all_sprites: dict) -> dict:
     """
-    Draw a level on a window.
+    Builds the animation table of a dictionary of directional sprites.
+
+    Args:
+        all_sprites (dict): A dictionary of sprites loaded with direction=True.
+
+    Returns:
+        A dictionary mapping (name, direction) to a tuple of (sprite, mask) frames.
+    """
+
+    animations = {}
+    for name, sprites in all_sprites.items():
+        name, direction = name.rsplit("_", 1)
+        animations[(name, direction)] = tuple(
+            (sprite, pygame.mask.from_surface(sprite)) for sprite in sprites
+        )
+
+    return animations
+
+
+
+def draw_level(window: pygame.display, layer: ChunkedLayer, offset_x: int) -> None:
+    """
+    Draw the visible part of a level on a window.
 
     Args:
         window (pygame.display): The window to draw on.
-        objects (list): A list of objects to draw.
+        layer (ChunkedLayer): The pre-rendered chunks of the level.
         offset_x (int): The x-offset of the level.
 
     Returns:
         None
     """
 
-    for i in objects:
-        window.blit(i.image, (i.rect.x - offset_x, i.rect.y))
+    layer.draw(window, offset_x)
 
 
 
 
-def get_background(name: str, width: int, height: int) -> pygame.image:
+def get_background(name: str, width: int, height: int, alpha: bool = True) -> pygame.image:
     """
-    Load a background image.
+    Get a background image from the asset registry.
 
     Args:
         name (str): The name of the image file.
         width (int): The width of the image.
         height (int): The height of the image.
+        alpha (bool): Whether to keep the transparency of the image.
 
     Returns:
         A pygame image object.
     """
 
-    image = pygame.image.load(join("Background", name))
-    image = pygame.transform.scale(image, (width, height))
-
-    return image
+    return get_image(join("Background", name), (width, height), alpha)
 
 
 
 
-def draw(window: pygame.display, background: pygame.image, life_img: pygame.image, player, offset_x: int, objects: list) -> None:
+def draw(window: pygame.display, background: pygame.image, life_img: pygame.image, player, offset_x: int, layer: ChunkedLayer, dirty: DirtyRects, profiler: FrameProfiler = None, alpha: float = 1.0, entities: EntitySystem = None) -> None:
     """
     Draw the game screen.
 
@@ -105,80 +131,88 @@ def draw(window: pygame.display, background: pygame.image, life_img: pygame.imag
         life_img (pygame.image): The life image.
         player (Player): An instance of the Player class.
         offset_x (int): The x offset of the screen.
-        objects (list): A list of objects to draw.
+        layer (ChunkedLayer): The pre-rendered chunks of the level.
+        dirty (DirtyRects): The tracker of the screen areas to push to the display.
+        profiler (FrameProfiler): The profiler whose overlay to draw, if any.
+        alpha (float): How far the player is drawn between its previous and current position, from 0 to 1.
+        entities (EntitySystem): The moving entities of the level, if any.
 
     Returns:
         None
     """
+    check_formats({"background": background, "life image": life_img, "player sprite": player.sprite})
     window.blit(background, (0, 0))
-    draw_level(window, objects, offset_x)
-    window.blit(life_img, (70, 20))
-    player.draw(window, offset_x)
-    pygame.display.update()
-
-def handle_vertical_collision(player, objects: list, dy: int) -> list:
+    draw_level(window, layer, offset_x)
+    if entities:
+        drawn = entities.draw(window, offset_x, alpha)
+        if drawn:
+            dirty.add(drawn)
+    dirty.add(window.blit(life_img, (70, 20)))
+    dirty.add(player.draw(window, offset_x, alpha))
+    if profiler and profiler.visible:
+        dirty.add(profiler.draw(window))
+    dirty.scroll_to(offset_x)
+    dirty.update()
+
+def resolve_move(player, objects: list, probe_dx: int, dy: int) -> dict:
     """
-    Handle vertical collision between a player and a list of objects.
+    Finds the player's contacts with a list of objects in one pass, pushing it out of the floor or ceiling.
+
+    The side contacts are what the probe moves of the old collision code
+    (collide() in benchmark.py) find with the player moved by -probe_dx and
+    probe_dx, and the floor and ceiling are what its vertical pass finds, in
+    the same order, but the player is never moved to probe. The rects are
+    compared first, so only the objects whose rect overlaps are compared
+    pixel by pixel.
 
     Args:
         player (Player): An instance of the Player class.
-        objects (list): A list of objects to check for collision.
+        objects (list): A list of objects to check for collision, in priority order.
+        probe_dx (int): How far to the left and right to look for side contacts.
         dy (int): The change in y-position of the player.
 
     Returns:
-        A list of collided objects.
+        A dictionary with the "left" and "right" contacts, the last "floor" and "ceiling" contacts
+        (each an object or None) and the kinds of the "hazards" touched, one per contact.
     """
 
-    collided_objects = []
+    rect = player.rect
+    mask = player.mask
+    left_rect = rect.move(-probe_dx, 0)
+    right_rect = rect.move(probe_dx, 0)
+    left = right = floor = ceiling = None
+    vertical = []
     for object in objects:
-        if pygame.sprite.collide_mask(player, object):
+        object_rect = object.rect
+        if left is None and left_rect.colliderect(object_rect) \
+                and mask.overlap(object.mask, (object_rect.x - left_rect.x, object_rect.y - left_rect.y)):
+            left = object
+        if right is None and right_rect.colliderect(object_rect) \
+                and mask.overlap(object.mask, (object_rect.x - right_rect.x, object_rect.y - right_rect.y)):
+            right = object
+        if rect.colliderect(object_rect) and mask.overlap(object.mask, (object_rect.x - rect.x, object_rect.y - rect.y)):
             if dy > 0:
-                player.rect.bottom = object.rect.top
+                rect.bottom = object_rect.top
                 player.landed()
+                floor = object
             elif dy < 0:
-                player.rect.top = object.rect.bottom
+                rect.top = object_rect.bottom
                 player.hit_head()
-        
-            collided_objects.append(object)
-
-    return collided_objects
-
-
-
-
-def collide(player, objects: list, dx: int) -> pygame.sprite.Sprite:
-    """
-    Check for collision between a player and a list of objects.
+                ceiling = object
+            vertical.append(object)
 
-    Args:
-        player (Player): An instance of the Player class.
-        objects (list): A list of objects to check for collision.
-        dx (int): The change in x-position of the player.
-
-    Returns:
-        The first object in objects that collides with player or None if there is no collision.
-    """
-
-    player.move(dx, 0)
-    player.update()
-    collided_object = next(
-        (
-            object
-            for object in objects
-            if pygame.sprite.collide_mask(player, object)
-        ),
-        None,
-    )
-    player.move(-dx, 0)
-    player.update()
+    hazards = [
+        TILE_KINDS[object.tile_number] for object in (left, right, *vertical)
+        if object and TILE_KINDS[object.tile_number] != "tile"
+    ]
 
-    return collided_object
+    return {"left": left, "right": right, "floor": floor, "ceiling": ceiling, "hazards": hazards}
 
 
 
 def get_mask(tile_number: int, tile_size: int, x_pos: int, y_pos: int) -> pygame.sprite.Sprite:
     """
-    Returns a Pygame sprite object with an image loaded from a file.
+    Returns a Pygame sprite object with the shared image and mask of a tile type.
 
     Args:
         tile_number (int): The number of the tile to load.
@@ -190,85 +224,221 @@ def get_mask(tile_number: int, tile_size: int, x_pos: int, y_pos: int) -> pygame
         A pygame sprite object.
     """
 
-    tile_image = pygame.image.load(f"Tiles/{tile_number}.png").convert_alpha()
-    tile_image = pygame.transform.scale(tile_image, (tile_size, tile_size))
+    tile_image, tile_mask = get_tile(tile_number, tile_size)
     tile = pygame.sprite.Sprite()
     tile.image = tile_image
     tile.rect = tile_image.get_rect()
     tile.rect.x = x_pos * tile_size
     tile.rect.y = y_pos * tile_size
-    tile.mask = pygame.mask.from_surface(tile_image)
+    tile.mask = tile_mask
+    tile.tile_number = tile_number
 
     return tile
 
 
 
-def handle_move(player, objects: list, player_vel: int, height: int, enemies: list, water: list) -> None:
+def handle_move(player, world: CollisionGrid, player_vel: int, height: int, keys) -> None:
     """
     Handles player movement and collision detection.
 
+    Only the objects in the columns of cells around the player are checked,
+    so the cost does not grow with the length of the level, and they are all
+    checked in a single pass by resolve_move(). The columns are looked up
+    over the whole height of the screen, since a vertical snap can move the
+    player onto the next tile of a stacked column, as a scan over every
+    object would.
+
     Args:
         player (Player): An instance of the Player class.
-        objects (list): A list of objects that can be collided with.
+        world (CollisionGrid): A grid of the objects that can be collided with.
         player_vel (int): The velocity of the player.
         height (int): The height of the screen.
-        enemies (list): A list of enemy objects.
-        water (list): A list of water objects.
+        keys: The pressed state of each key, indexed like pygame.key.get_pressed().
 
     Returns:
         None
     """
 
-    keys = pygame.key.get_pressed()
-
     player.x_vel = 0
-    collide_left = collide(player, objects, -player_vel * 2)
-    collide_right = collide(player, objects, player_vel * 2)
+    area = player.rect.inflate(player_vel * 4, 0)
+    objects = world.query(pygame.Rect(area.x, 0, area.width, height))
+    contacts = resolve_move(player, objects, player_vel * 2, player.y_vel)
 
-    if keys[pygame.K_LEFT] and not collide_left and not player.hit:
+    if keys[pygame.K_LEFT] and not contacts["left"] and not player.hit:
         player.move_left(player_vel)
-    if keys[pygame.K_RIGHT] and not collide_right and not player.hit:
+    if keys[pygame.K_RIGHT] and not contacts["right"] and not player.hit:
         player.move_right(player_vel)
 
-    vertical_collide = handle_vertical_collision(player, objects, player.y_vel)
-    to_check = [collide_left, collide_right, *vertical_collide]
-    for object in to_check:
-        if object:
-            if object in enemies:
-                player.make_hit()
-            elif object in water:
-                player.rect.y += 18
-                player.y_vel += 10
-                player.make_hit()
+    for kind in contacts["hazards"]:
+        if kind == "enemy":
+            player.make_hit()
+        elif kind == "water":
+            player.rect.y += 18
+            player.y_vel += 10
+            player.make_hit()
     
     if player.rect.y > height:
         player.make_hit()
 
 
 
-def get_objects(level: int, obj_tile_numbers: list, tile_size: int) -> list:
+def get_layers(level_data, tile_size: int) -> dict:
     """
-    Returns a list of pygame sprite objects.
+    Returns the sprite objects of a level grid, classified by TILE_KINDS in one pass.
 
     Args:
-        level (int): The level number to load.
-        obj_tile_numbers (list): A list of tile numbers to check the type of the tile.
+        level_data: A Level or a list of rows of tile numbers.
         tile_size (int): The size of each tile in pixels.
 
     Returns:
-        A list of pygame sprite objects.
+        A dictionary mapping "tile", "enemy" and "water" to lists of pygame sprite objects.
     """
 
-    objects = []
-    level_data = pickle.load(open(f"Levels/level_{level}", "rb"))
+    layers = {"tile": [], "enemy": [], "water": []}
     for y_pos, row in enumerate(level_data):
-        objects.extend(
-            get_mask(tile, tile_size, x_pos, y_pos)
-            for x_pos, tile in enumerate(row)
-            if tile > -1 and tile in obj_tile_numbers
-        )
+        for x_pos, tile in enumerate(row):
+            if tile > -1:
+                layers[TILE_KINDS[tile]].append(get_mask(tile, tile_size, x_pos, y_pos))
+
+    return layers
+
 
-    return objects
+
+def get_objects(level: int, tile_size: int, path: str = "Levels") -> dict:
+    """
+    Loads a level file once and returns its sprite objects classified by tile kind.
+
+    Args:
+        level (int): The level number to load.
+        tile_size (int): The size of each tile in pixels.
+        path (str): The directory of the level files.
+
+    Returns:
+        A dictionary mapping "tile", "enemy" and "water" to lists of pygame sprite objects.
+    """
+
+    return get_layers(load_level(join(path, f"level_{level}")), tile_size)
+
+
+
+def get_world(layers: dict, tile_size: int) -> CollisionGrid:
+    """
+    Returns a collision grid of the sprite objects of a level, enemies first.
+
+    Args:
+        layers (dict): The sprite objects of a level classified by tile kind.
+        tile_size (int): The size of each tile in pixels.
+
+    Returns:
+        A CollisionGrid.
+    """
+
+    world = CollisionGrid(tile_size)
+    world.extend(layers["enemy"] + layers["tile"] + layers["water"])
+
+    return world
+
+
+
+class LevelStream():
+    """
+    Loads the column chunks of a level around the camera and evicts the ones far behind it.
+
+    The sprites of a chunk are only created once the chunk comes near the
+    screen, so a level of any length starts at once and keeps a bounded
+    number of sprites in memory.
+
+    Attributes:
+        KIND_ORDER (dict): The collision order of the tile kinds, matching get_world().
+        level (Level): The level being streamed.
+        chunk_columns (int): The number of columns of a chunk.
+        width (int): The width of the screen.
+        world (CollisionGrid): A grid of the loaded sprite objects.
+        layer (ChunkedLayer): The pre-rendered chunks of the loaded sprite objects.
+        chunks (dict): A dictionary mapping loaded chunk indices to their sprite objects.
+
+    Methods:
+        __init__(self, level, tile_size, width, chunk_columns): Initializes a stream and loads the first screen.
+        load_chunk(self, index): Creates the sprite objects of a chunk.
+        evict_chunk(self, index): Drops the sprite objects of a chunk.
+        update(self, offset_x, direction): Loads the chunks near the camera and evicts the far ones.
+    """
+
+    KIND_ORDER = {"enemy": 0, "tile": 1, "water": 2}
+
+    def __init__(self, level: Level, tile_size: int, width: int, chunk_columns: int = 32):
+        self.level = level
+        self.tile_size = tile_size
+        self.chunk_columns = chunk_columns
+        self.chunk_width = tile_size * chunk_columns
+        self.chunk_count = -(-level.columns // chunk_columns)
+        self.width = width
+        self.world = CollisionGrid(tile_size)
+        self.layer = ChunkedLayer(self.chunk_width, level.rows * tile_size)
+        self.chunks = {}
+        self.update(0, 0)
+
+    def load_chunk(self, index: int) -> None:
+        """
+        Creates the sprite objects of a chunk and adds them to the world and the layer.
+
+        Args:
+            index (int): The index of the chunk.
+
+        Returns:
+            None
+        """
+
+        sprites = []
+        columns = range(index * self.chunk_columns, min((index + 1) * self.chunk_columns, self.level.columns))
+        for y_pos, row in enumerate(self.level):
+            for x_pos in columns:
+                tile = row[x_pos]
+                if tile > -1:
+                    sprite = get_mask(tile, self.tile_size, x_pos, y_pos)
+                    self.world.add(sprite, (self.KIND_ORDER[TILE_KINDS[tile]], y_pos, x_pos))
+                    sprites.append(sprite)
+
+        self.layer.extend(sprites)
+        self.chunks[index] = sprites
+
+    def evict_chunk(self, index: int) -> None:
+        """
+        Drops the sprite objects of a chunk from the world and the layer.
+
+        Args:
+            index (int): The index of the chunk.
+
+        Returns:
+            None
+        """
+
+        for sprite in self.chunks.pop(index):
+            self.world.remove(sprite)
+        self.layer.remove_chunk(index)
+
+    def update(self, offset_x: int, direction: int) -> None:
+        """
+        Loads the chunks within a chunk of the screen, plus one more in the direction of travel,
+        and evicts the chunks more than two chunks away from the screen.
+
+        Args:
+            offset_x (int): The x-offset of the camera.
+            direction (int): The horizontal velocity of the player.
+
+        Returns:
+            None
+        """
+
+        first = (offset_x - self.chunk_width * (1 + (direction < 0))) // self.chunk_width
+        last = (offset_x + self.width + self.chunk_width * (1 + (direction > 0))) // self.chunk_width
+        for index in range(max(0, first), min(self.chunk_count - 1, last) + 1):
+            if index not in self.chunks:
+                self.load_chunk(index)
+
+        for index in list(self.chunks):
+            if index < first - 1 or index > last + 1:
+                self.evict_chunk(index)
 
 
 
@@ -278,7 +448,7 @@ class Player(pygame.sprite.Sprite):
 
     Attributes:
         GRAVITY (int): The strength of gravity applied to the player.
-        SPRITES (dict): A dictionary containing all of the player's sprites.
+        ANIMATIONS (dict): A dictionary mapping (name, direction) to the player's sprite and mask frames.
         ANIMATION_DELAY (int): The delay between animation frames.
 
     Methods:
@@ -293,19 +463,21 @@ class Player(pygame.sprite.Sprite):
         hit_head(self): Resets fall_count and inverts y_vel attribute when player hits their head on a surface.
         update_sprite(self): Updates the sprite animation based on current state of player object.
         update(self): Updates the position and mask attributes of the sprite object.
-        draw(self, win, offset_x): Draws the sprite object onto a window surface.
+        draw(self, win, offset_x, alpha): Draws the sprite object onto a window surface.
     """
 
     GRAVITY = 1
-    SPRITES = {}
+    ANIMATIONS = {}
     ANIMATION_DELAY = 3
 
     def __init__(self, x, y, width, height):
         super().__init__()
         self.rect = pygame.Rect(x, y, width, height)
+        self.previous = self.rect.topleft
         self.x_vel = 0
         self.y_vel = 0
         self.mask = None
+        self.sprite_mask = None
         self.direction = "left"
         self.animation_count = 0
         self.fall_count = 0
@@ -430,9 +602,9 @@ class Player(pygame.sprite.Sprite):
             sprite_name = "run"
 
 
-        sprites = self.SPRITES[f"{sprite_name}_{self.direction}"]
-        sprite_index = (self.animation_count // self.ANIMATION_DELAY) % len(sprites)
-        self.sprite = sprites[sprite_index]
+        frames = self.ANIMATIONS[(sprite_name, self.direction)]
+        sprite_index = (self.animation_count // self.ANIMATION_DELAY) % len(frames)
+        self.sprite, self.sprite_mask = frames[sprite_index]
         self.animation_count += 1
         self.update()
 
@@ -441,25 +613,208 @@ class Player(pygame.sprite.Sprite):
         """
         Updates the position and mask attributes of the sprite object.
         """
-        self.rect = self.sprite.get_rect(topleft = (self.rect.x, self.rect.y))
-        self.mask = pygame.mask.from_surface(self.sprite)
+        self.rect.size = self.sprite.get_size()
+        self.mask = self.sprite_mask
 
-    def draw(self, win: pygame.display, offset_x: int) -> None:
+    def draw(self, win: pygame.display, offset_x: int, alpha: float = 1.0) -> pygame.Rect:
         """
         Draws the sprite object onto a window surface.
 
         Args:
             win (pygame.display): The display to draw the player's sprite onto.
             offset_x (int): The x-coordinate offset of the screen.
+            alpha (float): How far to draw the sprite between its previous and current position, from 0 to 1.
         
         Returns:
-            None
+            The area of the window that was drawn on.
+        """
+        x = round(self.previous[0] + (self.rect.x - self.previous[0]) * alpha)
+        y = round(self.previous[1] + (self.rect.y - self.previous[1]) * alpha)
+        return win.blit(self.sprite, (x - offset_x, y))
+
+
+
+class Simulation():
+    """
+    The game state of a level, advanced in fixed steps of 1 / FPS seconds.
+
+    A simulation needs no window, event queue or clock, so it can be stepped
+    as fast as the machine allows under SDL's dummy video driver. The player's
+    animations still have to be loaded, which needs a display mode to be set.
+
+    advance() runs as many steps as fit in the elapsed time, so the game runs
+    at the same speed whatever the frame rate, and keeps the leftover time to
+    interpolate what is drawn between the last two steps.
+
+    Attributes:
+        FPS (int): The rate of the physics steps.
+        STEP (float): The duration of a physics step in seconds.
+        MAX_STEPS (int): The most steps advance() runs in one frame, after which the backlog is dropped.
+        PLAYER_VEL (int): The horizontal velocity of the player.
+        SCROLL_AREA_WIDTH (int): The distance from the screen edges at which the camera follows the player.
+        alpha (float): How far the time of the last advance() is between the previous and current step, from 0 to 1.
+
+    Methods:
+        __init__(self, width, height, world, animations, profiler, stream, recorder, entities): Initializes the simulation of a level.
+        step(self, keys, jumps): Advances the simulation by one step.
+        advance(self, dt, keys, jumps): Advances the simulation by the steps that fit in the elapsed time.
+        draw_offset_x(self): Returns the camera offset interpolated between the last two steps.
+    """
+
+    FPS = 60
+    STEP = 1 / FPS
+    MAX_STEPS = 5
+    PLAYER_VEL = 6
+    SCROLL_AREA_WIDTH = 400
+
+    def __init__(self, width: int, height: int, world: CollisionGrid, animations: dict, profiler: FrameProfiler = None, stream: LevelStream = None, recorder=None, entities: EntitySystem = None):
+        self.width = width
+        self.height = height
+        self.player = Player(100, 100, 50, 50)
+        self.player.ANIMATIONS = animations
+        self.world = world
+        self.stream = stream
+        self.offset_x = 0
+        self.previous_offset_x = 0
+        self.accumulator = 0
+        self.alpha = 1.0
+        self.pending_jumps = 0
+        self.frame = 0
+        self.game_over = [False, 40]
+        self.profiler = profiler or FrameProfiler()
+        self.recorder = recorder
+        self.entities = entities
+
+    def step(self, keys, jumps: int = 0) -> bool:
+        """
+        Advances the simulation by one step.
+
+        Args:
+            keys: The pressed state of each key, indexed like pygame.key.get_pressed().
+            jumps (int): The number of K_UP presses in the step.
+
+        Returns:
+            True if the game is over, False otherwise.
+        """
+
+        if self.recorder:
+            self.recorder.record(keys, jumps)
+
+        player = self.player
+        player.previous = player.rect.topleft
+        self.previous_offset_x = self.offset_x
+        if self.stream:
+            self.stream.update(self.offset_x, player.x_vel)
+            self.profiler.mark("stream")
+
+        for _ in range(jumps):
+            if player.jump_count < 2 and not player.hit:
+                player.jump()
+
+        player.loop(self.FPS)
+        self.profiler.mark("loop")
+        handle_move(player, self.world, self.PLAYER_VEL, self.height, keys)
+        self.profiler.mark("handle_move")
+
+        if self.entities:
+            self.entities.update()
+            if len(self.entities.collide(player.rect, player.mask)):
+                player.make_hit()
+            self.profiler.mark("entities")
+
+        if ((player.rect.right - self.offset_x >= self.width - self.SCROLL_AREA_WIDTH) and player.x_vel > 0) or \
+                ((player.rect.left - self.offset_x <= self.SCROLL_AREA_WIDTH) and player.x_vel < 0):
+            self.offset_x += player.x_vel
+
+        self.frame += 1
+        if player.hit:
+            self.game_over[0] = True
+        if self.game_over[0]:
+            self.game_over[1] -= 1
+
+        return self.game_over[1] == 0
+
+    def advance(self, dt: float, keys, jumps: int = 0) -> bool:
         """
-        win.blit(self.sprite, (self.rect.x - offset_x, self.rect.y))
+        Advances the simulation by as many steps as fit in the elapsed time, at most MAX_STEPS.
 
+        Jumps are applied on the next step, so none are lost on a frame too short for a step.
 
+        Args:
+            dt (float): The time since the last call in seconds.
+            keys: The pressed state of each key, indexed like pygame.key.get_pressed().
+            jumps (int): The number of K_UP presses since the last call.
+
+        Returns:
+            True if the game is over, False otherwise.
+        """
+
+        self.pending_jumps += jumps
+        self.accumulator += dt
+        steps = 0
+        game_over = False
+        while self.accumulator >= self.STEP and not game_over:
+            if steps == self.MAX_STEPS:
+                self.accumulator %= self.STEP
+                break
+            game_over = self.step(keys, self.pending_jumps)
+            self.pending_jumps = 0
+            self.accumulator -= self.STEP
+            steps += 1
+
+        self.alpha = min(1.0, self.accumulator / self.STEP)
+
+        return game_over
+
+    def draw_offset_x(self) -> int:
+        """
+        Returns the camera offset interpolated between the last two steps.
+
+        Returns:
+            The x-offset to draw the level with.
+        """
+
+        return round(self.previous_offset_x + (self.offset_x - self.previous_offset_x) * self.alpha)
 
-def play(width: int, height: int, level: int, tile_size: int) -> bool:
+
+
+def create_game(width: int, height: int, level: int, tile_size: int, profiler: FrameProfiler = None, streaming: bool = True, recorder=None) -> tuple:
+    """
+    Loads a level and the player's animations into a new simulation.
+
+    A display mode must be set first, since the sprites are converted to its format.
+
+    Args:
+        width (int): The width of the game window.
+        height (int): The height of the game window.
+        level (int): The level number to load.
+        tile_size (int): The size of each tile in pixels.
+        profiler (FrameProfiler): The profiler of the frame phases.
+        streaming (bool): Whether to load the level in column chunks around the camera.
+        recorder (InputRecorder): The recorder of the input of each step, if any.
+
+    Returns:
+        A tuple of (simulation, layer), the layer holding the pre-rendered chunks of the level.
+        The simulation's entities start empty.
+    """
+
+    animations = get_asset(("animations", "Player"), lambda: get_animations(load_sprites("Player", 32, 32, True)))
+    if streaming:
+        stream = LevelStream(load_level(join("Levels", f"level_{level}")), tile_size, width)
+        world, layer = stream.world, stream.layer
+    else:
+        stream = None
+        world = get_world(get_objects(level, tile_size), tile_size)
+        layer = ChunkedLayer(tile_size * 32, height)
+        layer.extend(world)
+
+    entities = EntitySystem(tile_size)
+
+    return Simulation(width, height, world, animations, profiler, stream, recorder, entities), layer
+
+
+
+def play(width: int, height: int, level: int, tile_size: int, dirty_rects: bool = True, profiler: FrameProfiler = None, streaming: bool = True, render_fps: int = 60, record: str = None) -> bool:
     """
     Runs the game loop for the game.
 
@@ -468,6 +823,11 @@ def play(width: int, height: int, level: int, tile_size: int) -> bool:
         height (int): The height of the game window.
         level (str): The level number to load.
         tile_size (int): The size of each tile in pixels.
+        dirty_rects (bool): Whether to push only the changed areas of the screen to the display.
+        profiler (FrameProfiler): The profiler of the frame phases, toggled with F3.
+        streaming (bool): Whether to load the level in column chunks around the camera.
+        render_fps (int): The highest frame rate to draw at, independent of the physics rate. 0 for no limit.
+        record (str): The replay file to record the input of the session to, if any.
 
     Returns:
         True if game over, False otherwise.
@@ -479,56 +839,48 @@ def play(width: int, height: int, level: int, tile_size: int) -> bool:
     window = pygame.display.set_mode((width, height))
     clock = pygame.time.Clock()
 
-    background = get_background("background.png", width, height)
+    background = get_background("background.png", width, height, False)
     life_img = get_background("life.png", 40, 32)
 
-    FPS = 60
-    PLAYER_VEL = 6
-    offset_x = 0
-
-    player = Player(100, 100, 50, 50)
-    player.SPRITES = load_sprites("Player", 32, 32, True)
-    tiles = get_objects(level, [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 15, 16, 17], tile_size)
-    enemies = get_objects(level, [14, 18], tile_size)
-    water = get_objects(level, [12, 13], tile_size)
+    profiler = profiler or FrameProfiler()
+    recorder = InputRecorder(level, level_hash(join("Levels", f"level_{level}"))) if record else None
+    simulation, layer = create_game(width, height, level, tile_size, profiler, streaming, recorder)
+    dirty = DirtyRects(dirty_rects)
 
-    objects = enemies + tiles + water
-    scroll_area_width = 400
-
-    game_over = [False, 40]
+    last_time = perf_counter() - Simulation.STEP
     play = True
     while play:
-        clock.tick(FPS)
+        profiler.start_frame()
+        clock.tick(render_fps)
+        now = perf_counter()
+        dt, last_time = now - last_time, now
+        profiler.mark("tick")
 
+        jumps = 0
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 play = False
                 break
 
-            if (
-                event.type == pygame.KEYDOWN
-                and event.key == pygame.K_UP
-                and player.jump_count < 2
-                and not player.hit
-            ):
-                player.jump()
-
-        player.loop(FPS)
-        handle_move(player, objects, PLAYER_VEL, height, enemies, water)
-        draw(window, background, life_img, player, offset_x, objects)
-
-
-        if ((player.rect.right - offset_x >= width - scroll_area_width) and player.x_vel > 0) or \
-                ((player.rect.left - offset_x <= scroll_area_width) and player.x_vel < 0):
-            offset_x += player.x_vel
-
-        if player.hit:
-            game_over[0] = True
-        if game_over[0]:
-            game_over[1] -= 1
-        if game_over[1] == 0:
-            play = False
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_UP:
+                jumps += 1
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                profiler.toggle()
+                dirty.invalidate()
+        profiler.mark("events")
+
+        game_over = simulation.advance(dt, pygame.key.get_pressed(), jumps)
+        draw(window, background, life_img, simulation.player, simulation.draw_offset_x(), layer, dirty, profiler, simulation.alpha, simulation.entities)
+        profiler.mark("draw")
+        profiler.end_frame()
+
+        if game_over:
+            if recorder:
+                recorder.save(record)
             return True
 
+    if recorder:
+        recorder.save(record)
+    profiler.dump()
     pygame.quit()
     quit()
\ No newline at end of file
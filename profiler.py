@@ -0,0 +1,179 @@
+import csv
+import json
+import pygame
+from collections import deque
+from time import perf_counter
+from assets import get_font
+
+
+class FrameProfiler():
+    """
+    Times the phases of a frame loop into a ring buffer.
+
+    Each call to mark() charges the time since the previous mark to a phase.
+    While the profiler is disabled every method returns straight away, so
+    the calls can stay in the frame loops.
+
+    Attributes:
+        COLORS (list): The colors of the phase bars of the overlay.
+        output (str): The .csv or .json file the buffer is dumped to, or None.
+        enabled (bool): Whether frames are being recorded.
+        pending (bool): Whether recording starts at the next start_frame().
+        visible (bool): Whether the overlay is drawn.
+        frames (deque): The (frame_time, phases) pairs of the last recorded frames.
+
+    Methods:
+        __init__(self, output, size): Initializes a profiler, enabled if it has an output.
+        start_frame(self): Starts timing a frame.
+        mark(self, phase): Charges the time since the last mark to a phase.
+        end_frame(self): Stores the timed frame in the buffer.
+        toggle(self): Shows or hides the overlay, recording frames while it is shown.
+        stats(self): Returns the FPS, frame time percentiles and average phase times.
+        draw(self, window): Draws the overlay onto a window.
+        dump(self): Writes the buffer to the output file.
+    """
+
+    COLORS = [(230, 90, 70), (240, 200, 60), (90, 200, 90), (80, 160, 230), (190, 110, 220), (200, 200, 200)]
+
+    def __init__(self, output: str = None, size: int = 600):
+        self.output = output
+        self.enabled = output is not None
+        self.visible = False
+        self.pending = False
+        self.frames = deque(maxlen=size)
+        self.phases = {}
+        self.frame_start = 0
+        self.last = 0
+
+    def start_frame(self) -> None:
+        """
+        Starts timing a frame.
+        """
+        if self.pending:
+            self.enabled = True
+            self.pending = False
+        if not self.enabled:
+            return
+        self.frame_start = self.last = perf_counter()
+        self.phases = {}
+
+    def mark(self, phase: str) -> None:
+        """
+        Charges the time since the last mark to a phase.
+
+        Args:
+            phase (str): The name of the phase that just ended.
+
+        Returns:
+            None
+        """
+        if not self.enabled:
+            return
+        now = perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0) + now - self.last
+        self.last = now
+
+    def end_frame(self) -> None:
+        """
+        Stores the timed frame in the buffer.
+        """
+        if not self.enabled:
+            return
+        self.frames.append((perf_counter() - self.frame_start, self.phases))
+
+    def toggle(self) -> None:
+        """
+        Shows or hides the overlay, recording frames while it is shown.
+
+        The overlay is usually toggled in the middle of a frame, so recording
+        only starts at the next start_frame(). Hiding it disables the profiler
+        again unless it has an output.
+        """
+        self.visible = not self.visible
+        if self.visible:
+            self.pending = not self.enabled
+        else:
+            self.pending = False
+            self.enabled = self.output is not None
+
+    def stats(self) -> dict:
+        """
+        Returns the FPS, frame time percentiles and average phase times of the buffer.
+
+        Returns:
+            A dictionary with "fps", "p50_ms", "p99_ms" and "phases_ms".
+        """
+
+        if not self.frames:
+            return {"fps": 0, "p50_ms": 0, "p99_ms": 0, "phases_ms": {}}
+
+        frame_times = sorted(frame_time for frame_time, _ in self.frames)
+        phase_totals = {}
+        for _, phases in self.frames:
+            for phase, phase_time in phases.items():
+                phase_totals[phase] = phase_totals.get(phase, 0) + phase_time
+
+        return {
+            "fps": len(frame_times) / sum(frame_times),
+            "p50_ms": frame_times[len(frame_times) // 2] * 1000,
+            "p99_ms": frame_times[min(len(frame_times) - 1, len(frame_times) * 99 // 100)] * 1000,
+            "phases_ms": {phase: total * 1000 / len(frame_times) for phase, total in phase_totals.items()},
+        }
+
+    def draw(self, window: pygame.Surface) -> pygame.Rect:
+        """
+        Draws the overlay onto a window: FPS, frame time percentiles and a bar per phase.
+
+        Args:
+            window (pygame.Surface): The surface to draw on.
+
+        Returns:
+            The area of the window that was drawn on, or None if the overlay is hidden.
+        """
+
+        if not self.visible:
+            return None
+
+        stats = self.stats()
+        font = get_font("Futura", 20)
+        panel = pygame.Rect(window.get_width() - 290, 10, 280, 50 + 20 * len(stats["phases_ms"]))
+        window.fill((20, 20, 20), panel)
+
+        summary = f"FPS {stats['fps']:.0f}  p50 {stats['p50_ms']:.1f} ms  p99 {stats['p99_ms']:.1f} ms"
+        window.blit(font.render(summary, True, (255, 255, 255)), (panel.x + 8, panel.y + 8))
+
+        for i, (phase, phase_ms) in enumerate(stats["phases_ms"].items()):
+            y = panel.y + 34 + 20 * i
+            window.blit(font.render(f"{phase} {phase_ms:.2f}", True, (255, 255, 255)), (panel.x + 8, y))
+            bar_width = min(140, int(phase_ms / (1000 / 60) * 140))
+            window.fill(self.COLORS[i % len(self.COLORS)], (panel.x + 130, y + 3, max(1, bar_width), 12))
+
+        return panel
+
+    def dump(self) -> None:
+        """
+        Writes the buffer to the output file, as JSON if it ends in .json and as CSV otherwise.
+        """
+
+        if not self.output or not self.frames:
+            return
+
+        phase_names = []
+        for _, phases in self.frames:
+            phase_names.extend(phase for phase in phases if phase not in phase_names)
+
+        if self.output.endswith(".json"):
+            with open(self.output, "w") as json_out:
+                json.dump({
+                    "summary": self.stats(),
+                    "frames": [
+                        {"frame_ms": frame_time * 1000, "phases_ms": {phase: t * 1000 for phase, t in phases.items()}}
+                        for frame_time, phases in self.frames
+                    ],
+                }, json_out, indent=2)
+        else:
+            with open(self.output, "w", newline="") as csv_out:
+                writer = csv.writer(csv_out)
+                writer.writerow(["frame", "frame_ms", *(f"{phase}_ms" for phase in phase_names)])
+                for i, (frame_time, phases) in enumerate(self.frames):
+                    writer.writerow([i, frame_time * 1000, *(phases.get(phase, 0) * 1000 for phase in phase_names)])
@@ -0,0 +1,86 @@
+import struct
+import zlib
+import pygame
+
+
+MAGIC = b"RPLY"
+VERSION = 1
+HEADER = struct.Struct("<4sBI20sI")
+LEFT, RIGHT = 1, 2
+MAX_JUMPS = 63
+
+
+class ReplayKeys():
+    """
+    The pressed state of the keys of a recorded step, indexed like pygame.key.get_pressed().
+
+    Methods:
+        __init__(self, bits): Initializes the keys from the bits of a recorded step.
+    """
+
+    def __init__(self, bits: int):
+        self.left = bool(bits & LEFT)
+        self.right = bool(bits & RIGHT)
+
+    def __getitem__(self, key: int) -> bool:
+        if key == pygame.K_LEFT:
+            return self.left
+        if key == pygame.K_RIGHT:
+            return self.right
+        return False
+
+
+class InputRecorder():
+    """
+    Records the input of each simulation step of a play session.
+
+    A step is stored as one byte: the left and right keys in the two low bits
+    and the number of K_UP presses in the others. Since the physics run on a
+    fixed timestep, the steps replay the session exactly, whatever the frame
+    rate it was played at.
+
+    Attributes:
+        level (int): The number of the level played.
+        level_hash (str): The SHA-1 of the level file.
+        steps (bytearray): The recorded steps.
+
+    Methods:
+        __init__(self, level, level_hash): Initializes an empty recording of a level.
+        record(self, keys, jumps): Adds the input of a step.
+        save(self, path): Writes the recording to a replay file.
+    """
+
+    def __init__(self, level: int, level_hash: str):
+        self.level = level
+        self.level_hash = level_hash
+        self.steps = bytearray()
+
+    def record(self, keys, jumps: int) -> None:
+        """
+        Adds the input of a step.
+
+        Args:
+            keys: The pressed state of each key, indexed like pygame.key.get_pressed().
+            jumps (int): The number of K_UP presses in the step.
+
+        Returns:
+            None
+        """
+
+        bits = (LEFT if keys[pygame.K_LEFT] else 0) | (RIGHT if keys[pygame.K_RIGHT] else 0)
+        self.steps.append(bits | min(jumps, MAX_JUMPS) << 2)
+
+    def save(self, path: str) -> None:
+        """
+        Writes the recording to a replay file: a header and the zlib-compressed steps.
+
+        Args:
+            path (str): The path of the replay file.
+
+        Returns:
+            None
+        """
+
+        with open(path, "wb") as replay_out:
+            replay_out.write(HEADER.pack(MAGIC, VERSION, self.level, bytes.fromhex(self.level_hash), len(self.steps)))
+            replay_out.write(zlib.compress(bytes(self.steps)))
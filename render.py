@@ -0,0 +1,486 @@
+import pygame
+from abc import ABC, abstractmethod
+
+
+class ChunkCache(ABC):
+    """
+    A cache of rendered chunk surfaces that keeps the max_chunks most recently drawn.
+
+    Subclasses render a chunk in render_chunk(), drawing on a surface from
+    new_surface(), which is already in the display format.
+
+    Attributes:
+        max_chunks (int): The number of rendered chunks kept in memory.
+        surfaces (dict): A dictionary mapping chunk indices to their rendered surfaces, least recently drawn first.
+
+    Methods:
+        __init__(self, max_chunks): Initializes an empty cache.
+        new_surface(self, size, alpha): Returns a blank surface in the display format.
+        render_chunk(self, index): Renders a chunk; implemented by subclasses.
+        render(self, index): Returns the rendered surface of a chunk.
+        invalidate(self, index): Drops the rendered surface of a chunk.
+    """
+
+    def __init__(self, max_chunks: int):
+        self.max_chunks = max_chunks
+        self.surfaces = {}
+
+    def new_surface(self, size: tuple, alpha: bool = True) -> pygame.Surface:
+        """
+        Returns a blank surface, converted to the display format if a display mode is set.
+
+        Args:
+            size (tuple): The (width, height) of the surface.
+            alpha (bool): Whether the surface is transparent.
+
+        Returns:
+            A pygame surface.
+        """
+
+        if not alpha:
+            surface = pygame.Surface(size)
+            return surface.convert() if pygame.display.get_surface() else surface
+
+        surface = pygame.Surface(size, pygame.SRCALPHA)
+        return surface.convert_alpha() if pygame.display.get_surface() else surface
+
+    @abstractmethod
+    def render_chunk(self, index: int) -> pygame.Surface:
+        """
+        Renders a chunk onto a new surface.
+
+        Args:
+            index (int): The index of the chunk.
+
+        Returns:
+            A pygame surface or None if the chunk is empty.
+        """
+
+    def render(self, index: int) -> pygame.Surface:
+        """
+        Returns the rendered surface of a chunk, rendering it if it is not cached.
+
+        Args:
+            index (int): The index of the chunk.
+
+        Returns:
+            A pygame surface or None if the chunk is empty.
+        """
+
+        if index in self.surfaces:
+            self.surfaces[index] = self.surfaces.pop(index)
+            return self.surfaces[index]
+
+        surface = self.render_chunk(index)
+        if surface is None:
+            return None
+
+        if len(self.surfaces) >= self.max_chunks:
+            del self.surfaces[next(iter(self.surfaces))]
+        self.surfaces[index] = surface
+
+        return surface
+
+    def invalidate(self, index: int) -> None:
+        """
+        Drops the rendered surface of a chunk so it is rendered again when next drawn.
+
+        Args:
+            index (int): The index of the chunk.
+
+        Returns:
+            None
+        """
+
+        self.surfaces.pop(index, None)
+
+
+
+class ChunkedLayer(ChunkCache):
+    """
+    A static layer of sprites pre-rendered into fixed-width chunk surfaces.
+
+    A chunk is rendered the first time it becomes visible and kept until it is
+    the least recently drawn of more than max_chunks cached chunks, so drawing
+    costs one or two blits per frame whatever the length of the level.
+
+    The chunks are run-length encoded, since they are never drawn on again
+    and are mostly empty: a blit skips their transparent runs and copies
+    their opaque ones, and only blends the soft edges of the tiles.
+
+    Attributes:
+        chunk_width (int): The width of a chunk in pixels.
+        height (int): The height of a chunk in pixels.
+        max_chunks (int): The number of rendered chunks kept in memory.
+        sprites (dict): A dictionary mapping chunk indices to the sprites drawn on them.
+        surfaces (dict): A dictionary mapping chunk indices to their rendered surfaces.
+
+    Methods:
+        __init__(self, chunk_width, height, max_chunks): Initializes an empty layer.
+        add(self, sprite): Adds a sprite to the chunks its rect overlaps.
+        extend(self, sprites): Adds a list of sprites in order.
+        invalidate(self, index): Drops the rendered surface of a chunk.
+        remove_chunk(self, index): Drops the sprites and the rendered surface of a chunk.
+        render_chunk(self, index): Renders the sprites of a chunk.
+        draw(self, window, offset_x): Draws the visible chunks onto a window.
+    """
+
+    def __init__(self, chunk_width: int, height: int, max_chunks: int = 8):
+        super().__init__(max_chunks)
+        self.chunk_width = chunk_width
+        self.height = height
+        self.sprites = {}
+
+    def chunk_range(self, left: int, right: int) -> range:
+        """
+        Returns the indices of the chunks between two x positions.
+
+        Args:
+            left (int): The left x position, inclusive.
+            right (int): The right x position, exclusive.
+
+        Returns:
+            A range of chunk indices.
+        """
+
+        return range(left // self.chunk_width, (right - 1) // self.chunk_width + 1)
+
+    def add(self, sprite: pygame.sprite.Sprite) -> None:
+        """
+        Adds a sprite to the chunks its rect overlaps.
+
+        Args:
+            sprite (pygame.sprite.Sprite): The sprite to add.
+
+        Returns:
+            None
+        """
+
+        for index in self.chunk_range(sprite.rect.left, sprite.rect.right):
+            self.sprites.setdefault(index, []).append(sprite)
+            self.invalidate(index)
+
+    def extend(self, sprites: list) -> None:
+        """
+        Adds a list of sprites in order.
+
+        Args:
+            sprites (list): The sprites to add.
+
+        Returns:
+            None
+        """
+
+        for sprite in sprites:
+            self.add(sprite)
+
+    def remove_chunk(self, index: int) -> None:
+        """
+        Drops the sprites and the rendered surface of a chunk.
+
+        Args:
+            index (int): The index of the chunk.
+
+        Returns:
+            None
+        """
+
+        self.sprites.pop(index, None)
+        self.invalidate(index)
+
+    def render_chunk(self, index: int) -> pygame.Surface:
+        """
+        Renders the sprites of a chunk onto a new surface.
+
+        Args:
+            index (int): The index of the chunk.
+
+        Returns:
+            A pygame surface or None if the chunk is empty.
+        """
+
+        if index not in self.sprites:
+            return None
+
+        surface = self.new_surface((self.chunk_width, self.height))
+        chunk_x = index * self.chunk_width
+        for sprite in self.sprites[index]:
+            surface.blit(sprite.image, (sprite.rect.x - chunk_x, sprite.rect.y))
+        surface.set_alpha(255, pygame.RLEACCEL)
+
+        return surface
+
+    def draw(self, window: pygame.Surface, offset_x: int) -> None:
+        """
+        Draws the chunks between offset_x and offset_x + the window width.
+
+        Args:
+            window (pygame.Surface): The surface to draw on.
+            offset_x (int): The x-offset of the level.
+
+        Returns:
+            None
+        """
+
+        for index in self.chunk_range(offset_x, offset_x + window.get_width()):
+            surface = self.render(index)
+            if surface:
+                window.blit(surface, (index * self.chunk_width - offset_x, 0))
+
+
+
+class TileLayer(ChunkCache):
+    """
+    A grid of tile numbers pre-rendered into fixed-width chunk surfaces, repainted cell by cell.
+
+    Chunks are rendered from the grid the first time they become visible and
+    at most max_chunks of them are kept. After a cell of the grid changes,
+    paint() redraws only that cell of its chunk.
+
+    Attributes:
+        level_data: A Level or a list of rows of tile numbers.
+        tiles (list): The tile images, indexed by tile number.
+        tile_size (int): The size of each tile in pixels.
+        chunk_columns (int): The number of columns of a chunk.
+        max_chunks (int): The number of rendered chunks kept in memory.
+        surfaces (dict): A dictionary mapping chunk indices to their rendered surfaces.
+
+    Methods:
+        __init__(self, level_data, tiles, tile_size, chunk_columns, max_chunks): Initializes a layer over a grid.
+        render_chunk(self, index): Renders the tiles of a chunk.
+        paint(self, x, y): Redraws one cell after it changed in the grid.
+        draw(self, window, scroll, width): Draws the visible chunks onto a window.
+    """
+
+    def __init__(self, level_data, tiles: list, tile_size: int, chunk_columns: int = 32, max_chunks: int = 8):
+        super().__init__(max_chunks)
+        self.level_data = level_data
+        self.tiles = tiles
+        self.tile_size = tile_size
+        self.chunk_columns = chunk_columns
+        self.chunk_width = chunk_columns * tile_size
+
+    def render_chunk(self, index: int) -> pygame.Surface:
+        """
+        Renders the tiles of a chunk onto a new surface.
+
+        Args:
+            index (int): The index of the chunk.
+
+        Returns:
+            A pygame surface.
+        """
+
+        surface = self.new_surface((self.chunk_width, len(self.level_data) * self.tile_size))
+        first = index * self.chunk_columns
+        for y, row in enumerate(self.level_data):
+            for x in range(first, min(first + self.chunk_columns, len(row))):
+                if row[x] > -1:
+                    surface.blit(self.tiles[row[x]], ((x - first) * self.tile_size, y * self.tile_size))
+
+        return surface
+
+    def paint(self, x: int, y: int) -> None:
+        """
+        Redraws one cell of its chunk after it changed in the grid.
+
+        Args:
+            x (int): The column of the cell.
+            y (int): The row of the cell.
+
+        Returns:
+            None
+        """
+
+        surface = self.surfaces.get(x // self.chunk_columns)
+        if surface is None:
+            return
+
+        cell = pygame.Rect((x % self.chunk_columns) * self.tile_size, y * self.tile_size, self.tile_size, self.tile_size)
+        surface.fill((0, 0, 0, 0), cell)
+        tile = self.level_data[y][x]
+        if tile > -1:
+            surface.blit(self.tiles[tile], cell)
+
+    def draw(self, window: pygame.Surface, scroll: int, width: int) -> None:
+        """
+        Draws the chunks between scroll and scroll + width.
+
+        Args:
+            window (pygame.Surface): The surface to draw on.
+            scroll (int): The x-offset of the level.
+            width (int): The width of the visible part of the level.
+
+        Returns:
+            None
+        """
+
+        columns = len(self.level_data[0])
+        last = min((scroll + width - 1) // self.chunk_width, (columns - 1) // self.chunk_columns)
+        for index in range(max(0, scroll // self.chunk_width), last + 1):
+            window.blit(self.render(index), (index * self.chunk_width - scroll, 0))
+
+
+
+class Backdrop(ChunkCache):
+    """
+    The editor's background and grid pre-rendered into screen-wide chunk surfaces.
+
+    Chunk k holds the k-th copy of the background with the grid lines over
+    it. Chunks are as wide as the visible part of the level, so drawing
+    costs one or two blits per frame whatever the number of columns.
+
+    Attributes:
+        color (tuple): The fill color behind and below the background.
+        background (pygame.Surface): The background image, as wide as a chunk.
+        grid_color (tuple): The color of the grid lines.
+        columns (int): The number of columns of the grid.
+        rows (int): The number of rows of the grid.
+        tile_size (int): The size of each grid cell in pixels.
+        repeats (int): The number of copies of the background.
+        size (tuple): The size of a chunk.
+        surfaces (dict): A dictionary mapping chunk indices to their rendered surfaces.
+
+    Methods:
+        __init__(self, color, background, grid_color, columns, rows, tile_size, height, repeats, max_chunks): Initializes a backdrop.
+        render_chunk(self, index): Renders the background and grid of a chunk.
+        draw(self, window, scroll, width): Draws the visible chunks onto a window.
+    """
+
+    def __init__(self, color: tuple, background: pygame.Surface, grid_color: tuple, columns: int, rows: int, tile_size: int, height: int, repeats: int = 6, max_chunks: int = 4):
+        super().__init__(max_chunks)
+        self.color = color
+        self.background = background
+        self.grid_color = grid_color
+        self.columns = columns
+        self.rows = rows
+        self.tile_size = tile_size
+        self.repeats = repeats
+        self.size = (background.get_width(), height)
+
+    def render_chunk(self, index: int) -> pygame.Surface:
+        """
+        Renders the background and grid lines of a chunk onto a new surface.
+
+        Args:
+            index (int): The index of the chunk.
+
+        Returns:
+            A pygame surface.
+        """
+
+        chunk_width, height = self.size
+        chunk_x = index * chunk_width
+        surface = self.new_surface(self.size, False)
+        surface.fill(self.color)
+        if 0 <= index < self.repeats:
+            surface.blit(self.background, (0, 0))
+
+        grid_height = self.rows * self.tile_size
+        first = max(0, -(-chunk_x // self.tile_size))
+        last = min(self.columns, (chunk_x + chunk_width - 1) // self.tile_size)
+        for c in range(first, last + 1):
+            pygame.draw.line(surface, self.grid_color, (c * self.tile_size - chunk_x, 0), (c * self.tile_size - chunk_x, grid_height))
+        for c in range(self.rows + 1):
+            pygame.draw.line(surface, self.grid_color, (0, c * self.tile_size), (chunk_width, c * self.tile_size))
+
+        return surface
+
+    def draw(self, window: pygame.Surface, scroll: int, width: int) -> None:
+        """
+        Draws the chunks between scroll and scroll + width and fills the window to their right.
+
+        Args:
+            window (pygame.Surface): The surface to draw on.
+            scroll (int): The x-offset of the level.
+            width (int): The width of the visible part of the level.
+
+        Returns:
+            None
+        """
+
+        chunk_width = self.size[0]
+        for index in range(scroll // chunk_width, (scroll + width - 1) // chunk_width + 1):
+            window.blit(self.render(index), (index * chunk_width - scroll, 0))
+        if window.get_width() > width:
+            window.fill(self.color, (width, 0, window.get_width() - width, window.get_height()))
+
+
+
+class DirtyRects():
+    """
+    Collects the screen areas changed in a frame and pushes only those to the display.
+
+    The areas of the previous frame are pushed again so that whatever moved
+    away from them is cleared. Any scroll of the camera falls back to a full
+    display update.
+
+    Attributes:
+        enabled (bool): Whether to push only the changed areas.
+        full (bool): Whether the next update must push the whole display.
+        offset_x (int): The camera offset of the last drawn frame.
+        previous (list): The areas changed in the previous frame.
+        current (list): The areas changed in the current frame.
+
+    Methods:
+        __init__(self, enabled): Initializes the tracker with a full first update.
+        add(self, rect): Marks an area of the current frame as changed.
+        invalidate(self): Makes the next update push the whole display.
+        scroll_to(self, offset_x): Invalidates the display if the camera moved.
+        update(self): Pushes the changed areas or the whole display.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.full = True
+        self.offset_x = 0
+        self.previous = []
+        self.current = []
+
+    def add(self, rect: pygame.Rect) -> None:
+        """
+        Marks an area of the current frame as changed.
+
+        Args:
+            rect (pygame.Rect): The changed area in screen coordinates.
+
+        Returns:
+            None
+        """
+
+        self.current.append(pygame.Rect(rect))
+
+    def invalidate(self) -> None:
+        """
+        Makes the next update push the whole display.
+        """
+        self.full = True
+
+    def scroll_to(self, offset_x: int) -> None:
+        """
+        Invalidates the display if the camera moved since the last frame.
+
+        Args:
+            offset_x (int): The camera offset of the current frame.
+
+        Returns:
+            None
+        """
+
+        if offset_x != self.offset_x:
+            self.offset_x = offset_x
+            self.full = True
+
+    def update(self) -> None:
+        """
+        Pushes the changed areas of the frame, or the whole display when needed.
+        """
+
+        if self.full or not self.enabled:
+            pygame.display.update()
+        else:
+            pygame.display.update(self.previous + self.current)
+
+        self.previous = self.current
+        self.current = []
+        self.full = False
@@ -0,0 +1,150 @@
+import os
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import hashlib
+import json
+import sys
+import zlib
+from os.path import join
+from time import perf_counter
+import pygame
+import play
+from levels import level_hash
+from recording import HEADER, MAGIC, VERSION, InputRecorder, ReplayKeys
+from render import DirtyRects
+
+
+def load_replay(path: str) -> InputRecorder:
+    """
+    Loads a replay file.
+
+    Args:
+        path (str): The path of the replay file.
+
+    Returns:
+        An InputRecorder holding the recorded steps.
+
+    Raises:
+        ValueError: If the file is not a replay file of this version.
+    """
+
+    with open(path, "rb") as replay_in:
+        data = replay_in.read()
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path} is not a replay file")
+
+    magic, version, level, digest, count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} replay file")
+
+    recording = InputRecorder(level, digest.hex())
+    recording.steps = bytearray(zlib.decompress(data[HEADER.size:]))
+    if len(recording.steps) != count:
+        raise ValueError(f"{path} is truncated")
+
+    return recording
+
+
+def run_replay(recording: InputRecorder, width: int, height: int, tile_size: int, window: bool = False, streaming: bool = True) -> dict:
+    """
+    Plays a recording back as fast as possible and times each step.
+
+    Args:
+        recording (InputRecorder): The recording to play back.
+        width (int): The width of the game window.
+        height (int): The height of the game window.
+        tile_size (int): The size of each tile in pixels.
+        window (bool): Whether to draw each step to the window.
+        streaming (bool): Whether to load the level in column chunks around the camera.
+
+    Returns:
+        A dictionary with the summary of the step times, the final player state and the times of each step.
+
+    Raises:
+        ValueError: If the level file changed since the recording.
+    """
+
+    level_path = join("Levels", f"level_{recording.level}")
+    if level_hash(level_path) != recording.level_hash:
+        raise ValueError(f"{level_path} changed since the recording")
+
+    pygame.init()
+    screen = pygame.display.set_mode((width, height))
+    background = play.get_background("background.png", width, height, False)
+    life_img = play.get_background("life.png", 40, 32)
+    simulation, layer = play.create_game(width, height, recording.level, tile_size, streaming=streaming)
+    dirty = DirtyRects()
+
+    trace = hashlib.md5()
+    frames = []
+    steps = 0
+    start = perf_counter()
+    for bits in recording.steps:
+        step_start = perf_counter()
+        game_over = simulation.step(ReplayKeys(bits), bits >> 2)
+        step_end = perf_counter()
+        if window:
+            pygame.event.pump()
+            play.draw(screen, background, life_img, simulation.player, simulation.offset_x, layer, dirty, entities=simulation.entities)
+        frames.append({"step_ms": (step_end - step_start) * 1000, "draw_ms": (perf_counter() - step_end) * 1000})
+
+        player = simulation.player
+        trace.update(repr((tuple(player.rect), player.x_vel, player.y_vel, player.hit, player.jump_count)).encode())
+        steps += 1
+        if game_over:
+            break
+    total = perf_counter() - start
+
+    player = simulation.player
+    step_times = sorted(frame["step_ms"] for frame in frames) or [0]
+
+    return {
+        "level": recording.level,
+        "steps": steps,
+        "total_s": total,
+        "step_ms": {
+            "mean": sum(step_times) / len(step_times),
+            "p50": step_times[len(step_times) // 2],
+            "p99": step_times[min(len(step_times) - 1, len(step_times) * 99 // 100)],
+        },
+        "draw_ms_mean": sum(frame["draw_ms"] for frame in frames) / max(1, len(frames)),
+        "final": {
+            "rect": list(player.rect),
+            "x_vel": player.x_vel,
+            "y_vel": player.y_vel,
+            "hit": player.hit,
+            "jump_count": player.jump_count,
+            "offset_x": simulation.offset_x,
+            "game_over": simulation.game_over[0],
+            "trace": trace.hexdigest(),
+        },
+        "frames": frames,
+    }
+
+
+def main(argv: list) -> None:
+    parser = argparse.ArgumentParser(description="Play a recorded session back and time it.")
+    parser.add_argument("replay", help="The replay file recorded by play().")
+    parser.add_argument("--window", action="store_true", help="Draw each step to a window.")
+    parser.add_argument("--no-streaming", action="store_true", help="Load the whole level up front.")
+    parser.add_argument("--frames", action="store_true", help="Include the times of each step in the report.")
+    parser.add_argument("--output", help="The JSON file to write the report to, stdout by default.")
+    args = parser.parse_args(argv)
+
+    if not args.window:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+    report = run_replay(load_replay(args.replay), 1280, 720, 720 // 16, args.window, not args.no_streaming)
+    if not args.frames:
+        del report["frames"]
+
+    if args.output:
+        with open(args.output, "w") as json_out:
+            json.dump(report, json_out, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
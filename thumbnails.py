@@ -0,0 +1,147 @@
+import multiprocessing
+import os
+import pygame
+from concurrent.futures import ProcessPoolExecutor
+from os.path import join
+from levels import load_level
+
+
+TILE_IMAGES = {}
+
+
+def render_thumbnail(level_path: str, thumbnail_path: str, cell_size: int) -> str:
+    """
+    Renders the tile grid of a level file to a PNG thumbnail.
+
+    This runs in the worker processes, so it only uses surfaces that do not
+    need a display.
+
+    Args:
+        level_path (str): The path of the level file.
+        thumbnail_path (str): The path of the PNG file to write.
+        cell_size (int): The width and height of a tile in the thumbnail, in pixels.
+
+    Returns:
+        The path of the written thumbnail.
+    """
+
+    level_data = load_level(level_path)
+    thumbnail = pygame.Surface((level_data.columns * cell_size, level_data.rows * cell_size), pygame.SRCALPHA, 32)
+    for y, row in enumerate(level_data):
+        for x, tile_number in enumerate(row):
+            if tile_number < 0:
+                continue
+            if (tile_number, cell_size) not in TILE_IMAGES:
+                tile_image = pygame.image.load(f"Tiles/{tile_number}.png")
+                TILE_IMAGES[(tile_number, cell_size)] = pygame.transform.smoothscale(tile_image, (cell_size, cell_size))
+            thumbnail.blit(TILE_IMAGES[(tile_number, cell_size)], (x * cell_size, y * cell_size))
+
+    temporary_path = f"{thumbnail_path}.{os.getpid()}.png"
+    pygame.image.save(thumbnail, temporary_path)
+    os.replace(temporary_path, thumbnail_path)
+
+    return thumbnail_path
+
+
+class ThumbnailCache():
+    """
+    Thumbnails of the levels of a catalog, rendered in worker processes and cached on disk by level content hash.
+
+    The thumbnail directory is created up front, since creating it inside
+    the level directory later would change its modification time and make
+    the catalog rescan.
+
+    The workers are spawned rather than forked, since the game process
+    already has a display and decoding threads when the pool starts.
+
+    Attributes:
+        catalog (LevelCatalog): The catalog of the levels.
+        path (str): The directory of the cached thumbnails.
+        cell_size (int): The width and height of a tile in a thumbnail, in pixels.
+        thumbnails (dict): A dictionary mapping content hashes to loaded thumbnails.
+        rendering (dict): A dictionary mapping content hashes to the futures of the thumbnails being rendered.
+
+    Methods:
+        __init__(self, catalog, path, cell_size, workers): Initializes an empty cache.
+        thumbnail_path(self, content_hash): Returns the path of the thumbnail of a level content hash.
+        update(self): Starts rendering the thumbnails of the catalog that are not cached.
+        get(self, number): Returns the thumbnail of a level if it is ready.
+        close(self): Stops the workers.
+    """
+
+    def __init__(self, catalog, path: str = "Levels/.thumbnails", cell_size: int = 4, workers: int = None):
+        self.catalog = catalog
+        self.path = path
+        self.cell_size = cell_size
+        self.thumbnails = {}
+        self.rendering = {}
+        os.makedirs(self.path, exist_ok=True)
+        workers = workers or min(4, os.cpu_count() or 1)
+        self.executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def thumbnail_path(self, content_hash: str) -> str:
+        """
+        Returns the path of the thumbnail of a level content hash.
+
+        Args:
+            content_hash (str): The content hash of the level file.
+
+        Returns:
+            The path of the PNG file.
+        """
+
+        return join(self.path, f"{content_hash}_{self.cell_size}.png")
+
+    def update(self) -> None:
+        """
+        Starts rendering the thumbnails of the catalog's levels that are not cached on disk yet.
+        """
+
+        for number, entry in self.catalog.levels.items():
+            content_hash = entry["hash"]
+            if content_hash in self.thumbnails or content_hash in self.rendering:
+                continue
+            thumbnail_path = self.thumbnail_path(content_hash)
+            if not os.path.isfile(thumbnail_path):
+                level_path = join(self.catalog.path, f"level_{number}")
+                self.rendering[content_hash] = self.executor.submit(
+                    render_thumbnail, level_path, thumbnail_path, self.cell_size
+                )
+
+    def get(self, number: int) -> pygame.Surface:
+        """
+        Returns the thumbnail of a level, loading it from disk on first use.
+
+        Args:
+            number (int): The number of the level.
+
+        Returns:
+            A pygame surface, or None if the thumbnail is still rendering or could not be rendered.
+        """
+
+        entry = self.catalog.levels.get(number)
+        if entry is None:
+            return None
+
+        content_hash = entry["hash"]
+        if content_hash not in self.thumbnails:
+            rendering = self.rendering.get(content_hash)
+            if rendering is not None:
+                if not rendering.done():
+                    return None
+                del self.rendering[content_hash]
+                if rendering.exception() is not None:
+                    self.thumbnails[content_hash] = None
+                    return None
+            try:
+                self.thumbnails[content_hash] = pygame.image.load(self.thumbnail_path(content_hash)).convert_alpha()
+            except (FileNotFoundError, pygame.error):
+                self.thumbnails[content_hash] = None
+
+        return self.thumbnails[content_hash]
+
+    def close(self) -> None:
+        """
+        Stops the workers, cancelling the thumbnails that have not started rendering.
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)